@@ -0,0 +1,41 @@
+"""add trigram index on unaccented unit name
+
+Revision ID: 493120bf45e2
+Revises: d0eea768f6d8
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '493120bf45e2'
+down_revision = 'd0eea768f6d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # unaccent() is only STABLE (it depends on search_path), so it can't be used
+    # in an index. Pinning the schema and dictionary makes the wrapper immutable.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """
+    )
+    # Must match the expression used by crud.unit_name_matches
+    op.execute(
+        "CREATE INDEX ix_unit_name_unaccent_trgm ON unit "
+        "USING gin (immutable_unaccent(lower(name)) gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_unit_name_unaccent_trgm")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
@@ -0,0 +1,44 @@
+"""add foreign key indexes
+
+Revision ID: 5c8e1d7a9f24
+Revises: 493120bf45e2
+Create Date: 2026-10-18 10:04:27.551390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1d7a9f24'
+down_revision = '493120bf45e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres does not index the referencing side of a foreign key, so listing
+    # by these columns and the FK checks on user deletes scanned the tables.
+    # unit_user(unit_id) is already covered by uq_unit_user.
+    op.create_index('ix_item_owner_id', 'item', ['owner_id'])
+    op.create_index('ix_unit_created_by', 'unit', ['created_by'])
+    op.create_index('ix_unit_user_user_id', 'unit_user', ['user_id'])
+    op.create_index('ix_unit_user_updated_by', 'unit_user', ['updated_by'])
+    op.create_index(
+        'ix_unit_user_leader',
+        'unit_user',
+        ['unit_id'],
+        postgresql_where=sa.text('is_leader'),
+        postgresql_include=['user_id'],
+    )
+    op.create_index('ix_audit_log_created_by', 'audit_log', ['created_by'])
+
+
+def downgrade():
+    op.drop_index('ix_audit_log_created_by', table_name='audit_log')
+    op.drop_index('ix_unit_user_leader', table_name='unit_user')
+    op.drop_index('ix_unit_user_updated_by', table_name='unit_user')
+    op.drop_index('ix_unit_user_user_id', table_name='unit_user')
+    op.drop_index('ix_unit_created_by', table_name='unit')
+    op.drop_index('ix_item_owner_id', table_name='item')
@@ -0,0 +1,90 @@
+"""partition audit_log by month
+
+Revision ID: a3f9c2d41b67
+Revises: 5c8e1d7a9f24
+Create Date: 2026-10-18 11:20:53.716402
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c2d41b67'
+down_revision = '5c8e1d7a9f24'
+branch_labels = None
+depends_on = None
+
+# Keep in sync with AUDIT_LOG_PARTITIONS_AHEAD, the app creates later months
+MONTHS_AHEAD = 3
+
+log_result = postgresql.ENUM(name='logresult', create_type=False)
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def _audit_log_columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('created_by', sa.Uuid(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', log_result, nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    ]
+
+
+def upgrade():
+    op.rename_table('audit_log', 'audit_log_old')
+    op.execute('ALTER TABLE audit_log_old RENAME CONSTRAINT audit_log_pkey TO audit_log_old_pkey')
+    op.drop_index('ix_audit_log_created_by', table_name='audit_log_old')
+
+    # The primary key of a partitioned table must contain the partition key
+    op.create_table('audit_log',
+    *_audit_log_columns(),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_audit_log_created_at', 'audit_log', ['created_at', 'id'])
+    op.create_index('ix_audit_log_created_by', 'audit_log', ['created_by', 'created_at'])
+
+    oldest = op.get_bind().execute(sa.text('SELECT min(created_at) FROM audit_log_old')).scalar()
+    month = (oldest or datetime.utcnow()).date().replace(day=1)
+    last = _add_months(datetime.utcnow().date().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE audit_log_p{month:%Y%m} PARTITION OF audit_log "
+            f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+        )
+        month = upper
+
+    op.execute(
+        'INSERT INTO audit_log (id, created_at, created_by, content, status) '
+        'SELECT id, created_at, created_by, content, status FROM audit_log_old'
+    )
+    op.drop_table('audit_log_old')
+
+
+def downgrade():
+    op.rename_table('audit_log', 'audit_log_partitioned')
+    op.create_table('audit_log_plain',
+    *_audit_log_columns(),
+    sa.PrimaryKeyConstraint('id', name='audit_log_plain_pkey'),
+    )
+    op.execute(
+        'INSERT INTO audit_log_plain (id, created_at, created_by, content, status) '
+        'SELECT id, created_at, created_by, content, status FROM audit_log_partitioned'
+    )
+    # Drops the partitions and their indexes as well
+    op.drop_table('audit_log_partitioned')
+    op.rename_table('audit_log_plain', 'audit_log')
+    op.execute('ALTER TABLE audit_log RENAME CONSTRAINT audit_log_plain_pkey TO audit_log_pkey')
+    op.create_index('ix_audit_log_created_by', 'audit_log', ['created_by'])
@@ -0,0 +1,32 @@
+"""make unit.created_at not null and index it for keyset pagination
+
+Revision ID: e5a1c7d93f02
+Revises: b81f4e6c2d93
+Create Date: 2026-10-18 16:05:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c7d93f02'
+down_revision = 'b81f4e6c2d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Units without created_at sorted first in the old keyset, keep them there
+    op.execute(
+        "UPDATE unit SET created_at = coalesce("
+        "(SELECT min(created_at) FROM unit), now() AT TIME ZONE 'utc') "
+        "WHERE created_at IS NULL"
+    )
+    op.alter_column('unit', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_unit_created_at_id', 'unit', ['created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_unit_created_at_id', table_name='unit')
+    op.alter_column('unit', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,26 @@
+"""add a default partition to audit_log
+
+Revision ID: f1b3d5a7c9e2
+Revises: e5a1c7d93f02
+Create Date: 2026-10-18 16:31:09.540127
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b3d5a7c9e2'
+down_revision = 'e5a1c7d93f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows outside the monthly partitions (maintenance late or stopped) go here
+    # instead of failing the insert, the app moves them once their month exists
+    op.execute('CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT')
+
+
+def downgrade():
+    # Drops the rows it holds, they have no other partition to go to
+    op.execute('DROP TABLE IF EXISTS audit_log_default')
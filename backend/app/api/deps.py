@@ -1,16 +1,23 @@
-from collections.abc import Generator
+import hashlib
+import time
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import token_cache, user_cache
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, engine
+from app.core.timing import timed
+from app.i18n.utils import resolve_locale
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -23,22 +30,57 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # Objects must stay readable after commit without an implicit (blocking) refresh
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def _decode_token(token: str) -> TokenPayload:
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = token_cache.get(cache_key)
+    if token_data is not None:
+        return token_data
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        with timed("jwt"):
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
         token_data = TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    # Never serve a token from the cache after it has expired
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(cache_key, token_data, ttl=expires_in)
+    return token_data
+
+
+def _get_cached_user(session: Session | AsyncSession, user_id: str) -> User | None:
+    data = user_cache.get(user_id)
+    if data is None:
+        return None
+    # Each request gets its own copy, attached to its session as if it had been
+    # loaded from there, so routes can still update or delete current_user.
+    user = User(**data)
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+
+def _remember_user(user: User | None) -> None:
+    if user is not None:
+        user_cache.set(str(user.id), user.model_dump())
+
+
+def _check_user(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -46,7 +88,37 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    user = _get_cached_user(session, str(token_data.sub))
+    if user is None:
+        user = session.get(User, token_data.sub)
+        _remember_user(user)
+    return _check_user(user)
+
+
+async def get_current_user_async(session: AsyncSessionDep, token: TokenDep) -> User:
+    token_data = _decode_token(token)
+    user = _get_cached_user(session, str(token_data.sub))
+    if user is None:
+        user = await session.get(User, token_data.sub)
+        _remember_user(user)
+    return _check_user(user)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
+
+
+def get_locale(
+    current_user: CurrentUser,
+    accept_language: Annotated[str | None, Header()] = None,
+) -> str:
+    lang = current_user.lang.value if current_user.lang else None
+    return resolve_locale(accept_language, lang)
+
+
+LocaleDep = Annotated[str, Depends(get_locale)]
 
 
 def get_current_active_superuser(current_user: CurrentUser) -> User:
@@ -55,3 +127,11 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_current_active_superuser_async(current_user: AsyncCurrentUser) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403, detail="The user doesn't have enough privileges"
+        )
+    return current_user
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils, units
+from app.api.routes import audit_logs, items, login, private, users, utils, units
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -9,6 +9,7 @@ api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(items.router)
 api_router.include_router(units.router)
+api_router.include_router(audit_logs.router)
 
 
 if settings.ENVIRONMENT == "local":
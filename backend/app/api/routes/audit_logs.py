@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row
+
+from app import crud
+from app.api.deps import AsyncSessionDep, get_current_active_superuser_async
+from app.models import AuditLogFilter, AuditLogsPublic, LogResult
+
+router = APIRouter(prefix="/audit-logs", tags=["audit-logs"])
+
+EXPORT_COLUMNS = ["id", "created_at", "created_by", "content", "status"]
+
+
+def get_audit_log_filter(
+    created_by: Annotated[list[uuid.UUID] | None, Query()] = None,
+    status: LogResult | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> AuditLogFilter:
+    return AuditLogFilter(
+        created_by=created_by,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+AuditLogFilterDep = Annotated[AuditLogFilter, Depends(get_audit_log_filter)]
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_active_superuser_async)],
+    response_model=AuditLogsPublic,
+)
+async def read_audit_logs(
+    session: AsyncSessionDep,
+    filters: AuditLogFilterDep,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+) -> Any:
+    """
+    Retrieve audit logs, newest first.
+
+    `created_from` is inclusive and `created_to` exclusive, a time range only
+    reads the monthly partitions it covers. Pass the returned `next_cursor`
+    as `cursor` to get the next page.
+    """
+    try:
+        return await crud.read_audit_logs_page(
+            session=session, filters=filters, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _export_values(row: Row[Any]) -> list[Any]:
+    return [
+        str(row.id),
+        row.created_at.isoformat(),
+        str(row.created_by),
+        row.content,
+        row.status.value if row.status else None,
+    ]
+
+
+async def _ndjson_lines(
+    chunks: AsyncIterator[Sequence[Row[Any]]],
+) -> AsyncIterator[str]:
+    async for rows in chunks:
+        yield "".join(
+            json.dumps(
+                dict(zip(EXPORT_COLUMNS, _export_values(row), strict=True)),
+                ensure_ascii=False,
+            )
+            + "\n"
+            for row in rows
+        )
+
+
+async def _csv_lines(chunks: AsyncIterator[Sequence[Row[Any]]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows(_export_values(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get(
+    "/export",
+    dependencies=[Depends(get_current_active_superuser_async)],
+    response_class=StreamingResponse,
+)
+async def export_audit_logs(
+    filters: AuditLogFilterDep,
+    format: Literal["ndjson", "csv"] = "ndjson",
+) -> StreamingResponse:
+    """
+    Export audit logs, oldest first, as NDJSON or CSV.
+
+    Rows are read with a server-side cursor and sent in chunks as they
+    arrive, so the size of the export does not affect the memory of the API.
+    """
+    chunks = crud.stream_audit_logs(filters=filters)
+    if format == "csv":
+        body, media_type = _csv_lines(chunks), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_lines(chunks), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit-logs.{format}"'},
+    )
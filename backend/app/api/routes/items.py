@@ -1,44 +1,86 @@
 import uuid
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, Literal
 
 from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from sqlmodel import col, func, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+)
+from app.core.pagination import (
+    CountMode,
+    SelectT,
+    count_rows,
+    key_columns,
+    paginate_by_keyset,
+    split_page,
+)
 from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+ITEM_PAGE_KEY = key_columns(Item.id)
+
 
 @router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def read_items(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    pagination: Literal["offset", "cursor"] = "offset",
+    cursor: str | None = None,
+    count_mode: CountMode = "exact",
 ) -> Any:
     """
     Retrieve items.
+
+    In cursor mode `skip` is ignored: pass the `next_cursor` of the previous
+    page as `cursor` (omit it for the first page) until it comes back empty.
+    `count_mode` selects how `count` is computed, see app.core.pagination.
     """
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    filters = []
+    if not current_user.is_superuser:
+        filters.append(col(Item.owner_id) == current_user.id)
+    use_cursor = pagination == "cursor" or cursor is not None
+
+    def paginate(statement: SelectT) -> SelectT:
+        if use_cursor:
+            return paginate_by_keyset(statement, ITEM_PAGE_KEY, cursor, limit)
+        return statement.offset(skip).limit(limit)
+
+    items: Sequence[Item]
+    count: int | None = None
+    try:
+        # After a cursor COUNT(*) OVER () would only count the remaining rows
+        if count_mode == "window" and cursor is None:
+            statement = select(Item, func.count().over()).where(*filters)
+            rows = (await session.exec(paginate(statement))).all()
+            items = [item for item, _ in rows]
+            # An empty page (past the end) carries no total, count it the usual way
+            count = rows[0][1] if rows else None
+        else:
+            items = (await session.exec(paginate(select(Item).where(*filters)))).all()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if count is None:
+        count = await count_rows(
+            session,
+            select(func.count()).select_from(Item).where(*filters),
+            mode=count_mode,
+            cache_key=f"item:{'all' if current_user.is_superuser else current_user.id}",
+            estimate_table=None if filters else "item",
         )
-        items = session.exec(statement).all()
 
-    return ItemsPublic(data=items, count=count)
+    if not use_cursor:
+        return ItemsPublic(data=items, count=count)
+    page, next_cursor = split_page(items, limit, lambda item: (item.id,))
+    return ItemsPublic(data=page, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{id}", response_model=ItemPublic)
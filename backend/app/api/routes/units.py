@@ -1,6 +1,5 @@
 import uuid
 from typing import Any
-import i18n
 
 from fastapi import HTTPException, APIRouter
 from sqlalchemy.exc import IntegrityError
@@ -13,10 +12,14 @@ from app.i18n.utils import translate
 
 from app import crud
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
     CurrentUser,
+    LocaleDep,
     SessionDep,
     get_current_active_superuser,
 )
+from app.core.audit import audit_log_writer
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
@@ -32,26 +35,28 @@ from app.models import (
     UserUpdateMe,
     UserUpdateThemes,
     UnitCreate,
+    UnitBulkCreate,
+    UnitsCreated,
     UnitUser,
     UnitRead,
     UnitFilterRequest,
+    UnitsPublic,
     Unit,
 LogResult,
 AuditLogCreate,
-UnitUpdate
+UnitUpdate,
+UnitMembersUpdate,
 )
 from app.utils import generate_new_account_email, send_email
 
 router = APIRouter(prefix="/units", tags=["units"])
-i18n.set("locale", "vi")  # Thiết lập ngôn ngữ mặc định
-i18n.set("fallback", "en")
 
 
 @router.get("/test-translation")
 async def test_translation():
     return {
-        "vi": i18n.t("unit.created"),
-        "en": i18n.t("unit.created")
+        "vi": translate("unit.created", "vi"),
+        "en": translate("unit.created", "en")
     }
 
 
@@ -60,53 +65,16 @@ async def test_translation():
     dependencies=[Depends(get_current_active_superuser)],
     response_model=Message,
 )
-def create_unit(session: SessionDep, unit_in: UnitCreate, current_user: CurrentUser) -> Any:
+def create_unit(
+    session: SessionDep, unit_in: UnitCreate, current_user: CurrentUser, locale: LocaleDep
+) -> Any:
     """
     Create new unit and assign leader/member to unit_user.
     """
     try:
-        # Check leader_id tồn tại
-        if unit_in.leader_id:
-            leader = session.get(User, unit_in.leader_id)
-            if not leader:
-                raise ValueError(f"User với id {unit_in.leader_id} (leader_id) không tồn tại.")
-
-        # Check các member_ids tồn tại
-        if unit_in.member_ids:
-            existing_users = session.exec(
-                select(User.id).where(User.id.in_(unit_in.member_ids))
-            ).all()
-
-            missing_ids = set(unit_in.member_ids) - set(existing_users)
-            if missing_ids:
-                raise ValueError(f"Các user_id sau không tồn tại: {', '.join(str(i) for i in missing_ids)}")
-
-        # 1. Tạo unit
-        unit = crud.create_unit(
-            session=session,
-            unit_create=unit_in,
-            creator=current_user.id
-        )
-
-        # 2. Tạo UnitUser cho leader
-        unit_user_leader = UnitUser(
-            unit_id=unit.id,
-            user_id=unit_in.leader_id,
-            is_leader=True,
-            updated_by=current_user.id,
-        )
-        session.add(unit_user_leader)
-
-        # 3. Tạo UnitUser cho các member khác
-        for member_id in unit_in.member_ids:
-            if member_id != unit_in.leader_id:
-                unit_user = UnitUser(
-                    unit_id=unit.id,
-                    user_id=member_id,
-                    is_leader=False,
-                    updated_by=current_user.id,
-                )
-                session.add(unit_user)
+        # Unit và toàn bộ thành viên trong cùng một transaction
+        crud.create_unit(session=session, unit_create=unit_in, creator=current_user.id)
+        session.commit()
 
         # Nếu đến đây là thành công
         log_create = AuditLogCreate(
@@ -114,10 +82,8 @@ def create_unit(session: SessionDep, unit_in: UnitCreate, current_user: CurrentU
             status=LogResult.success,
             content='Tạo unit',
         )
-        crud.create_log(session=session, log_create=log_create)
-
-        session.commit()
-        return {"message": translate("unit.created")}
+        audit_log_writer.log(log_create)
+        return {"message": translate("unit.created", locale)}
 
     except Exception as e:
         session.rollback()
@@ -128,25 +94,79 @@ def create_unit(session: SessionDep, unit_in: UnitCreate, current_user: CurrentU
             status=LogResult.failed,
             content=f"Tạo unit thất bại: {str(e)}"
         )
-        crud.create_log(session=session, log_create=log_create)
+        audit_log_writer.log(log_create)
 
         # Có thể raise lại lỗi phù hợp với FastAPI
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post(
+    "/bulk",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UnitsCreated,
+)
+def create_units(session: SessionDep, body: UnitBulkCreate, current_user: CurrentUser) -> Any:
+    """
+    Create many units with their leader/members at once.
+
+    All units are created or none: any invalid user or duplicate name fails
+    the whole request.
+    """
+    try:
+        ids = crud.create_units(
+            session=session, units_create=body.units, creator=current_user.id
+        )
+        session.commit()
+
+        log_create = AuditLogCreate(
+            created_by=current_user.id,
+            status=LogResult.success,
+            content=f"Tạo {len(ids)} unit",
+        )
+        audit_log_writer.log(log_create)
+        return UnitsCreated(ids=ids)
+
+    except Exception as e:
+        session.rollback()
+
+        log_create = AuditLogCreate(
+            created_by=current_user.id,
+            status=LogResult.failed,
+            content=f"Tạo {len(body.units)} unit thất bại: {str(e)}"
+        )
+        audit_log_writer.log(log_create)
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 
 @router.post("/filter", response_model=list[UnitRead])
-def post_filter_units(
+async def post_filter_units(
         filters: UnitFilterRequest,
-        session: SessionDep,
-        current_user: CurrentUser
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser
 ):
     """
     Filter units by criteria like name, creator, or leader.
     """
-    units = crud.filter_units(session=session, filters=filters)
+    units = await crud.filter_units(session=session, filters=filters)
     return units
 
+
+@router.post("/filter-page", response_model=UnitsPublic)
+async def post_filter_units_page(
+        filters: UnitFilterRequest,
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser
+):
+    """
+    Filter units like /filter, paginated with `cursor` instead of `page`.
+    Pass the returned `next_cursor` to get the next page.
+    """
+    try:
+        return await crud.filter_units_page(session=session, filters=filters)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
 @router.delete("/delete", response_model=Message)
 def delete_unit(
     unit_id: uuid.UUID,
@@ -162,7 +182,7 @@ def delete_unit(
                 status=LogResult.failed,
                 content=f"Xóa Unit {unit_id} thất bại do không tồn tại {unit_id} ",
             )
-            crud.create_log(session=session, log_create=log_create)
+            audit_log_writer.log(log_create)
             raise HTTPException(status_code=404, detail="Unit không tồn tại")
 
         # 2. Xóa các bản ghi liên quan trong bảng UnitUser
@@ -179,7 +199,7 @@ def delete_unit(
             status=LogResult.success,
             content=f"Xóa Unit {unit_id} thành công",
         )
-        crud.create_log(session=session, log_create=log_create)
+        audit_log_writer.log(log_create)
 
         return {"message": f"Unit {unit_id} đã được xóa thành công"}
 
@@ -198,7 +218,7 @@ def delete_unit(
             status=LogResult.failed,
             content=f"Xóa Unit {unit_id} thất bại do Lỗi cơ sở dữ liệu.",
         )
-        crud.create_log(session=session, log_create=log_create)
+        audit_log_writer.log(log_create)
         raise HTTPException(status_code=500, detail="Lỗi cơ sở dữ liệu.")
 
     except Exception as e:
@@ -208,7 +228,7 @@ def delete_unit(
             status=LogResult.failed,
             content=f"Xóa Unit {unit_id} không thành công",
         )
-        crud.create_log(session=session, log_create=log_create)
+        audit_log_writer.log(log_create)
         session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -217,7 +237,8 @@ def update_unit(
     unit_id: uuid.UUID,
     body: UnitUpdate,
     session: SessionDep,
-    current_user: CurrentUser
+    current_user: CurrentUser,
+    locale: LocaleDep,
 ):
     # 1. Lấy unit
     unit = session.get(Unit, unit_id)
@@ -231,36 +252,65 @@ def update_unit(
         unit.description = body.description
     session.add(unit)
 
-    # 3. Cập nhật thành viên nếu có
+    # 3. Cập nhật thành viên nếu có: chỉ thêm/xóa phần khác biệt
     if body.user_ids is not None:
-        # Xóa tất cả thành viên cũ
-        stmt = delete(UnitUser).where(UnitUser.unit_id == unit_id)
-        session.exec(stmt)
-
-        # Thêm mới danh sách user
-        for user_id in body.user_ids:
-            is_leader = body.leader_id == user_id
-            session.add(UnitUser(
+        try:
+            crud.update_unit_members(
+                session=session,
                 unit_id=unit_id,
-                user_id=user_id,
-                is_leader=is_leader,
-                updated_by=current_user.id
-            ))
+                user_ids=body.user_ids,
+                leader_id=body.leader_id,
+                updated_by=current_user.id,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     # 4. Nếu chỉ đổi leader
     elif body.leader_id is not None:
         # Đảm bảo leader phải là thành viên
-        member_stmt = select(UnitUser).where(UnitUser.unit_id == unit_id)
-        members = session.exec(member_stmt).all()
-        member_ids = [m.user_id for m in members]
-        if body.leader_id not in member_ids:
+        is_member = session.exec(
+            select(UnitUser.id).where(
+                UnitUser.unit_id == unit_id, UnitUser.user_id == body.leader_id
+            )
+        ).first()
+        if not is_member:
             raise HTTPException(status_code=400, detail="Leader phải là thành viên của Unit")
 
-        # Reset tất cả leader
-        for member in members:
-            member.is_leader = member.user_id == body.leader_id
-            member.updated_by = current_user.id
-            session.add(member)
+        crud.set_unit_leader(
+            session=session,
+            unit_id=unit_id,
+            leader_id=body.leader_id,
+            updated_by=current_user.id,
+        )
+
+    session.commit()
+    return {"message": translate("unit.updated", locale)}
+
 
+@router.patch("/members", response_model=Message)
+def update_unit_members(
+    unit_id: uuid.UUID,
+    body: UnitMembersUpdate,
+    session: SessionDep,
+    current_user: CurrentUser
+):
+    """
+    Add and/or remove members without sending the full member list.
+    Users already in the unit are skipped, the leader can't be removed.
+    """
+    if not session.get(Unit, unit_id):
+        raise HTTPException(status_code=404, detail="Unit không tồn tại")
+    try:
+        crud.remove_unit_members(
+            session=session, unit_id=unit_id, user_ids=body.remove_user_ids
+        )
+        crud.add_unit_members(
+            session=session,
+            unit_id=unit_id,
+            user_ids=body.add_user_ids,
+            updated_by=current_user.id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     session.commit()
-    return {"message": "Cập nhật Unit thành công"}
+    return {"message": "Cập nhật thành viên Unit thành công"}
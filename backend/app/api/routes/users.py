@@ -1,26 +1,59 @@
+import asyncio
+import codecs
+import csv
+import json
 import uuid
-from typing import Any
-import shutil
-import os
-
-
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from collections.abc import Iterator, Sequence
+from datetime import timedelta
+from pathlib import PurePosixPath
+from typing import IO, Any, Literal
+
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
+from minio.error import S3Error
+from PIL import UnidentifiedImageError
 from sqlmodel import col, delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
+    get_current_active_superuser_async,
 )
+from app.core.cache import invalidate_user
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.hashing import password_hasher
+from app.core.pagination import (
+    CountMode,
+    SelectT,
+    count_rows,
+    key_columns,
+    paginate_by_keyset,
+    split_page,
+)
 from app.models import (
+    AvatarUploadComplete,
+    AvatarUploadUrl,
+    AvatarUrl,
     Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
+    UserImportReport,
     UserPublic,
     UserRegister,
     UsersPublic,
@@ -29,28 +62,81 @@ from app.models import (
     UserUpdateThemes,
 )
 from app.utils import generate_new_account_email, send_email
-from app.minio.minio_utils import upload_file
+from app.minio.avatars import (
+    InvalidAvatar,
+    delete_avatar_task,
+    generate_thumbnails_task,
+    read_thumbnail,
+)
+from app.minio.minio_utils import (
+    LimitedReader,
+    SizeLimitExceeded,
+    delete_file,
+    presigned_download_url,
+    presigned_upload_url,
+    stat_file,
+    upload_stream,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+USER_PAGE_KEY = key_columns(User.id)
+
 
 @router.get(
     "/",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_active_superuser_async)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+        session: AsyncSessionDep,
+        skip: int = 0,
+        limit: int = 100,
+        pagination: Literal["offset", "cursor"] = "offset",
+        cursor: str | None = None,
+        count_mode: CountMode = "exact",
+) -> Any:
     """
     Retrieve users.
+
+    In cursor mode `skip` is ignored: pass the `next_cursor` of the previous
+    page as `cursor` (omit it for the first page) until it comes back empty.
+    `count_mode` selects how `count` is computed, see app.core.pagination.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    use_cursor = pagination == "cursor" or cursor is not None
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    def paginate(statement: SelectT) -> SelectT:
+        if use_cursor:
+            return paginate_by_keyset(statement, USER_PAGE_KEY, cursor, limit)
+        return statement.offset(skip).limit(limit)
 
-    return UsersPublic(data=users, count=count)
+    users: Sequence[User]
+    count: int | None = None
+    try:
+        # After a cursor COUNT(*) OVER () would only count the remaining rows
+        if count_mode == "window" and cursor is None:
+            rows = (await session.exec(paginate(select(User, func.count().over())))).all()
+            users = [user for user, _ in rows]
+            # An empty page (past the end) carries no total, count it the usual way
+            count = rows[0][1] if rows else None
+        else:
+            users = (await session.exec(paginate(select(User)))).all()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if count is None:
+        count = await count_rows(
+            session,
+            select(func.count()).select_from(User),
+            mode=count_mode,
+            cache_key="user:all",
+            estimate_table="user",
+        )
+
+    if not use_cursor:
+        return UsersPublic(data=users, count=count)
+    page, next_cursor = split_page(users, limit, lambda user: (user.id,))
+    return UsersPublic(data=page, count=count, next_cursor=next_cursor)
 
 
 @router.post(
@@ -80,6 +166,56 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+def _decode_lines(file: IO[bytes]) -> Iterator[str]:
+    # Không dùng io.TextIOWrapper: trên Python 3.10 SpooledTemporaryFile của
+    # UploadFile không có readable()/seekable()
+    return codecs.iterdecode(file, "utf-8-sig", errors="replace")
+
+
+def _read_csv(file: IO[bytes]) -> Iterator[dict[str, Any] | str]:
+    for record in csv.DictReader(_decode_lines(file)):
+        # Ô trống coi như không có, cột thừa (key None) bị bỏ
+        yield {key: value for key, value in record.items() if key and value}
+
+
+def _read_ndjson(file: IO[bytes]) -> Iterator[dict[str, Any] | str]:
+    for line in _decode_lines(file):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield f"Invalid JSON: {e.msg}"
+            continue
+        yield record if isinstance(record, dict) else "Expected a JSON object"
+
+
+@router.post(
+    "/import",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserImportReport,
+)
+def import_users(
+    session: SessionDep,
+    file: UploadFile = File(...),
+    format: Literal["csv", "ndjson"] | None = None,
+) -> Any:
+    """
+    Create users from a CSV (with a header row) or NDJSON file whose rows have
+    the fields of `POST /users/`. The format defaults to the file extension.
+
+    The file is read row by row and handled in batches: existing and repeated
+    emails are skipped, every row gets an entry in the report. Batches are
+    committed as they go, a failure keeps the users created so far.
+    """
+    if format is None:
+        format = "ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv"
+    records = _read_csv(file.file) if format == "csv" else _read_ndjson(file.file)
+    return crud.import_users(
+        session=session, records=records, batch_size=settings.USER_IMPORT_BATCH_SIZE
+    )
+
+
 @router.patch("/me", response_model=UserPublic)
 def update_user_me(
         *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
@@ -98,6 +234,7 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
+    invalidate_user(current_user.id)
     session.refresh(current_user)
     return current_user
 
@@ -109,16 +246,19 @@ def update_password_me(
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not password_hasher.verify(
+            body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = password_hasher.hash(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
     session.commit()
+    invalidate_user(current_user.id)
     return Message(message="Password updated successfully")
 
 
@@ -132,11 +272,12 @@ def update_themes(
     for field in ("lang", "themes_mode"):
         setattr(current_user, field, getattr(body, field))
     session.commit()
+    invalidate_user(current_user.id)
     return Message(message="Themes updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(current_user: AsyncCurrentUser) -> Any:
     """
     Get current user.
     """
@@ -152,8 +293,10 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
+    user_id = current_user.id
     session.delete(current_user)
     session.commit()
+    invalidate_user(user_id)
     return Message(message="User deleted successfully")
 
 
@@ -241,43 +384,175 @@ def delete_user(
     session.exec(statement)  # type: ignore
     session.delete(user)
     session.commit()
+    invalidate_user(user_id)
     return Message(message="User deleted successfully")
 
 
+def _avatar_prefix(user_id: uuid.UUID) -> str:
+    return f"avatars/{user_id}/"
+
+
+def _new_avatar_name(user_id: uuid.UUID, filename: str | None) -> str:
+    # Mỗi lần upload một tên mới: nội dung theo tên không bao giờ đổi nên cache lâu được
+    suffix = PurePosixPath(filename).suffix.lower()[:10] if filename else ""
+    return f"{_avatar_prefix(user_id)}{uuid.uuid4().hex}{suffix}"
+
+
+async def _set_avatar(
+    session: AsyncSession,
+    user: User,
+    object_name: str,
+    background_tasks: BackgroundTasks,
+) -> None:
+    previous = user.avatar
+    user.avatar = object_name
+    session.add(user)
+    await session.commit()
+    invalidate_user(user.id)
+    # Tạo thumbnail và xóa avatar cũ sau khi đã trả response
+    background_tasks.add_task(generate_thumbnails_task, object_name)
+    if previous and previous != object_name:
+        background_tasks.add_task(delete_avatar_task, previous)
+
+
 @router.post("/me/upload-avatar")
 async def upload_avatar(
-        session: SessionDep,
-        current_user: CurrentUser,
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser,
+        background_tasks: BackgroundTasks,
         file: UploadFile = File(...),
-
 ):
+    max_size = settings.AVATAR_MAX_SIZE_BYTES
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail=f"Avatar lớn hơn {max_size} byte")
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=415, detail="Avatar phải là ảnh")
+
+    # Tên object trên MinIO
+    object_name = _new_avatar_name(current_user.id, file.filename)
     try:
+        # Stream thẳng lên MinIO, put_object chặn nên chạy ngoài event loop
+        await asyncio.to_thread(
+            upload_stream,
+            LimitedReader(file.file, max_size),
+            object_name,
+            length=file.size if file.size is not None else -1,
+            content_type=file.content_type,
+        )
+    except SizeLimitExceeded:
+        raise HTTPException(status_code=413, detail=f"Avatar lớn hơn {max_size} byte")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-        # Lưu file tạm vào /tmp
-        temp_file_name = f"/tmp/{uuid.uuid4()}_{file.filename}"
-        # Ghi file upload vào file tạm
-        with open(temp_file_name, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    await _set_avatar(session, current_user, object_name, background_tasks)
+    return {
+        "status": "success",
+        "object_name": object_name,
+        "minio_url": f"/minio/{object_name}"  # hoặc tự tạo presigned URL nếu cần
+    }
 
-        # Tên object trên MinIO
-        object_name = f"avatars/user_{current_user.id}_{file.filename}"
 
-        # Upload lên MinIO
-        upload_file(
-            file_path=temp_file_name,
-            object_name=object_name,
-            content_type=file.content_type
+@router.post("/me/avatar/upload-url", response_model=AvatarUploadUrl)
+def create_avatar_upload_url(current_user: CurrentUser, filename: str | None = None) -> Any:
+    """
+    Presigned URL to PUT the avatar straight to object storage, the bytes don't
+    go through the API. Call /users/me/avatar/complete once uploaded.
+    """
+    object_name = _new_avatar_name(current_user.id, filename)
+    expires_in = settings.AVATAR_URL_EXPIRE_SECONDS
+    # Chỉ ký URL, không gọi tới MinIO
+    url = presigned_upload_url(object_name, timedelta(seconds=expires_in))
+    return AvatarUploadUrl(object_name=object_name, url=url, expires_in=expires_in)
+
+
+@router.post("/me/avatar/complete", response_model=UserPublic)
+async def complete_avatar_upload(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    background_tasks: BackgroundTasks,
+    body: AvatarUploadComplete,
+) -> Any:
+    """
+    Record an avatar uploaded with a presigned URL on the current user.
+    """
+    object_name = body.object_name
+    if not object_name.startswith(_avatar_prefix(current_user.id)) or ".." in object_name:
+        raise HTTPException(status_code=400, detail="Object không thuộc user này")
+    try:
+        stat = await asyncio.to_thread(stat_file, object_name)
+    except S3Error:
+        raise HTTPException(status_code=400, detail="Chưa upload avatar")
+    # URL presigned không giới hạn được kích thước và loại file, kiểm tra ở đây
+    if stat.size > settings.AVATAR_MAX_SIZE_BYTES or not (
+        stat.content_type or ""
+    ).startswith("image/"):
+        await asyncio.to_thread(delete_file, object_name)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Avatar phải là ảnh không quá {settings.AVATAR_MAX_SIZE_BYTES} byte",
         )
 
-        os.remove(temp_file_name)
-
-        # Xoá file tạm
-        return {
-            "status": "success",
-            "object_name": object_name,
-            "minio_url": f"/minio/{object_name}"  # hoặc tự tạo presigned URL nếu cần
-        }
+    await _set_avatar(session, current_user, object_name, background_tasks)
+    return current_user
 
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+@router.get("/{user_id}/avatar-url", response_model=AvatarUrl)
+async def read_avatar_url(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, user_id: uuid.UUID
+) -> Any:
+    """
+    Short-lived presigned URL to download the avatar of a user.
+    """
+    user = current_user if user_id == current_user.id else await session.get(User, user_id)
+    if not user or not user.avatar:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    expires_in = settings.AVATAR_URL_EXPIRE_SECONDS
+    url = presigned_download_url(user.avatar, timedelta(seconds=expires_in))
+    return AvatarUrl(url=url, expires_in=expires_in)
+
+
+def _parse_if_none_match(value: str | None) -> set[str]:
+    """ETag trong If-None-Match, bỏ dấu nháy và tiền tố W/."""
+    if not value:
+        return set()
+    return {
+        tag.strip().removeprefix("W/").strip('"') for tag in value.split(",")
+    } - {""}
+
+
+@router.get("/avatars/{user_id}/{name}")
+async def read_avatar(
+    request: Request,
+    session: AsyncSessionDep,
+    user_id: uuid.UUID,
+    name: str,
+    size: int,
+) -> Response:
+    """
+    WebP thumbnail of an avatar, `size` is one of AVATAR_THUMBNAIL_SIZES. The
+    path is the `avatar` of the user. Avatar names are never reused, so the
+    response can be cached for good and the URL needs no auth (for <img>).
+    """
+    if size not in settings.AVATAR_THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"size phải là một trong {settings.AVATAR_THUMBNAIL_SIZES}",
+        )
+    object_name = f"{_avatar_prefix(user_id)}{name}"
+    # Chỉ phục vụ avatar đang dùng, không phải mọi object dưới prefix của user
+    # (vd. file upload bằng presigned URL nhưng chưa complete)
+    user = await session.get(User, user_id)
+    if not user or user.avatar != object_name:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    etags = _parse_if_none_match(request.headers.get("if-none-match"))
+    try:
+        content, etag = await asyncio.to_thread(read_thumbnail, object_name, size, etags)
+    except (S3Error, UnidentifiedImageError, InvalidAvatar):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if content is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="image/webp", headers=headers)
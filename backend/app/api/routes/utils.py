@@ -1,8 +1,12 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app.core.metrics import collect
+from app.minio.minio_config import storage_status
+from app.models import HealthCheck, Message
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -27,5 +31,19 @@ def test_email(email_to: EmailStr) -> Message:
 
 
 @router.get("/health-check/")
-async def health_check() -> bool:
-    return True
+async def health_check() -> HealthCheck:
+    """
+    Liveness of the API, always 200. `status` is "degraded" while object storage
+    is unreachable, uploads and avatars fail until it recovers.
+    """
+    if storage_status.ready:
+        return HealthCheck(status="ok", storage="ok")
+    return HealthCheck(status="degraded", storage="unavailable")
+
+
+@router.get("/metrics/", dependencies=[Depends(get_current_active_superuser)])
+def read_metrics() -> dict[str, Any]:
+    """
+    In-process metrics of the worker serving the request, e.g. database pool usage.
+    """
+    return collect()
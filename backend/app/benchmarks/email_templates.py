@@ -0,0 +1,73 @@
+"""
+Measure the render time of each email template, per email.
+
+Compares the old way (read the file and compile a new Template for every
+email) with the shared, preloaded Environment used by render_email_template:
+
+    python -m app.benchmarks.email_templates --iterations 2000
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from jinja2 import Template
+
+from app.utils import (
+    EMAIL_TEMPLATES_DIR,
+    email_templates,
+    load_email_templates,
+    render_email_template,
+)
+
+CONTEXT = {
+    "project_name": "Benchmark",
+    "username": "user@example.com",
+    "email": "user@example.com",
+    "password": "benchmark-password",
+    "valid_hours": 48,
+    "link": "https://example.com/reset-password?token=benchmark",
+}
+
+
+def render_uncached(*, template_name: str, context: dict[str, Any]) -> str:
+    template_str = (EMAIL_TEMPLATES_DIR / template_name).read_text()
+    html: str = Template(template_str).render(context)
+    return html
+
+
+def measure(render: Callable[..., str], template_name: str, iterations: int) -> float:
+    """Return the median render time in microseconds."""
+    times: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render(template_name=template_name, context=CONTEXT)
+        times.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    load_email_templates()
+    print(f"Preloaded templates in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'template':<22} {'uncached µs':>12} {'cached µs':>10} {'speedup':>8}")
+    for name in email_templates.list_templates(extensions=["html"]):
+        assert render_uncached(template_name=name, context=CONTEXT) == (
+            render_email_template(template_name=name, context=CONTEXT)
+        )
+        uncached = measure(render_uncached, name, args.iterations)
+        cached = measure(render_email_template, name, args.iterations)
+        print(
+            f"{name:<22} {uncached:>12.1f} {cached:>10.1f} {uncached / cached:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
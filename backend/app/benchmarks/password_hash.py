@@ -0,0 +1,68 @@
+"""
+Measure bcrypt hash and verify time per cost factor on the current host.
+
+Run it on the deployment hardware and pick the highest BCRYPT_ROUNDS whose
+verify time fits the login latency budget:
+
+    python -m app.benchmarks.password_hash --rounds 10 11 12 13 --budget-ms 250
+"""
+
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+
+PASSWORD = "benchmark-password"
+
+
+def measure(rounds: int, iterations: int) -> tuple[float, float]:
+    """Return the median hash and verify time in milliseconds."""
+    handler = bcrypt.using(rounds=rounds)
+    # Warm up, the first call loads the bcrypt backend
+    handler.verify(PASSWORD, handler.hash(PASSWORD))
+    hash_times = []
+    verify_times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        hashed = handler.hash(PASSWORD)
+        hash_times.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        handler.verify(PASSWORD, hashed)
+        verify_times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(hash_times), statistics.median(verify_times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13, 14])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="recommend the highest cost whose verify time fits this budget",
+    )
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'hash ms':>10} {'verify ms':>10}")
+    recommended = None
+    for rounds in sorted(args.rounds):
+        hash_ms, verify_ms = measure(rounds, args.iterations)
+        current = "  (current)" if rounds == settings.BCRYPT_ROUNDS else ""
+        print(f"{rounds:>6} {hash_ms:>10.1f} {verify_ms:>10.1f}{current}")
+        if args.budget_ms is not None and verify_ms <= args.budget_ms:
+            recommended = rounds
+
+    if args.budget_ms is not None:
+        if recommended is None:
+            print(f"No tested cost verifies within {args.budget_ms:g} ms")
+        else:
+            print(f"Recommended BCRYPT_ROUNDS={recommended}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare unit name search with and without the trigram index.
+
+Seeds units with Vietnamese names inside a transaction that is rolled back at
+the end, then runs EXPLAIN ANALYZE for the old predicate (plain unaccent, no
+usable index) and the current one (immutable_unaccent, matches
+ix_unit_name_unaccent_trgm):
+
+    python -m app.benchmarks.unit_search --units 100000
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Connection, insert, text
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Unit, User
+from app.utils import strip_accents
+
+PREFIXES = ["Phòng", "Ban", "Trung tâm", "Chi nhánh", "Tổ", "Văn phòng"]
+DOMAINS = [
+    "Kế hoạch",
+    "Tài chính",
+    "Nhân sự",
+    "Kỹ thuật",
+    "Kinh doanh",
+    "Hành chính",
+    "Đào tạo",
+    "Pháp chế",
+]
+PLACES = ["Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Hải Phòng", "Cần Thơ", "Huế"]
+
+QUERIES = {
+    "before (unaccent)": "SELECT id FROM unit WHERE unaccent(lower(name)) ILIKE :pattern",
+    "after (trigram index)": (
+        "SELECT id FROM unit WHERE immutable_unaccent(lower(name)) ILIKE :pattern"
+    ),
+}
+
+
+def seed_units(conn: Connection, count: int, creator: uuid.UUID) -> None:
+    names = itertools.cycle(itertools.product(PREFIXES, DOMAINS, PLACES))
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": f"{' '.join(next(names))} {i}",
+            "created_at": datetime.utcnow(),
+            "created_by": creator,
+        }
+        for i in range(count)
+    ]
+    conn.execute(insert(Unit), rows)
+
+
+def explain(conn: Connection, sql: str, pattern: str) -> dict[str, Any]:
+    result = conn.execute(
+        text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), {"pattern": pattern}
+    ).scalar_one()
+    plan = result if isinstance(result, list) else json.loads(result)
+    return plan[0]  # type: ignore[no-any-return]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--units", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--keyword", action="append", help="search term, can be repeated"
+    )
+    args = parser.parse_args()
+    keywords = args.keyword or ["kế hoạch", "Đà Nẵng", "phap che 12", "tổ nhân sự hà"]
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            creator = conn.execute(
+                select(User.id).where(User.email == settings.FIRST_SUPERUSER)
+            ).scalar_one()
+            seed_units(conn, args.units, creator)
+            conn.execute(text("ANALYZE unit"))
+            total = conn.execute(text("SELECT count(*) FROM unit")).scalar_one()
+            print(f"Searching {total} units, median of {args.repeat} runs\n")
+
+            print(f"{'keyword':<24} {'query':<24} {'ms':>9} {'rows':>7}  index")
+            for keyword in keywords:
+                pattern = f"%{strip_accents(keyword).lower()}%"
+                for label, sql in QUERIES.items():
+                    runs = [explain(conn, sql, pattern) for _ in range(args.repeat)]
+                    ms = statistics.median(run["Execution Time"] for run in runs)
+                    rows = runs[0]["Plan"].get("Actual Rows", 0)
+                    uses_index = "ix_unit_name_unaccent_trgm" in json.dumps(runs[0])
+                    print(
+                        f"{keyword:<24} {label:<24} {ms:>9.2f} {rows:>7}  "
+                        f"{'yes' if uses_index else 'no'}"
+                    )
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
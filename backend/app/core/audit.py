@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import Connection, func, insert, select, text
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import Histogram, register_collector
+from app.models import AuditLog, AuditLogCreate
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two attempts while inserts keep failing, in seconds
+MAX_RETRY_DELAY = 60.0
+# Arbitrary key of the advisory lock serializing partition maintenance
+MAINTENANCE_LOCK_ID = 7_311_042
+PARTITION_NAME = re.compile(r"^audit_log_p(\d{4})(\d{2})$")
+# Catches rows outside the monthly partitions, e.g. when maintenance is late,
+# instead of failing the insert
+DEFAULT_PARTITION = "audit_log_default"
+
+
+class AuditLogWriter:
+    """
+    Buffer audit log entries in memory and insert them in batches.
+
+    `log` only appends to a buffer. A background thread inserts the buffered
+    entries with one multi-row INSERT once `batch_size` entries are waiting or
+    every `flush_interval` seconds, on its own connection so the request
+    transaction is never involved. `stop` flushes what is left and must be
+    called on shutdown.
+
+    Entries are inserted right away, in the calling thread, when the writer is
+    not running, with `synchronous=True` (tests) or when `max_buffer` entries
+    are already waiting because the database is not keeping up.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_buffer: int,
+        synchronous: bool = False,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.synchronous = synchronous
+        self.duration = Histogram()
+        self._buffer: list[dict[str, Any]] = []
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+
+    def log(self, log_create: AuditLogCreate) -> None:
+        # created_at is taken now, not when the batch is written
+        row = AuditLog.model_validate(log_create).model_dump()
+        with self._condition:
+            buffered = (
+                not self.synchronous
+                and self._thread is not None
+                and len(self._buffer) < self.max_buffer
+            )
+            if buffered:
+                self._buffer.append(row)
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify()
+        if not buffered:
+            self._insert([row])
+
+    def flush(self) -> int:
+        """Insert all buffered entries now, returns how many were written."""
+        with self._condition:
+            rows, self._buffer = self._buffer, []
+        if rows:
+            self._insert(rows)
+        return len(rows)
+
+    def _insert(self, rows: list[dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            connection.execute(insert(AuditLog), rows)
+        self.duration.observe(time.perf_counter() - start)
+        with self._condition:
+            self._written += len(rows)
+            self._batches += 1
+
+    def _requeue(self, rows: list[dict[str, Any]]) -> None:
+        with self._condition:
+            room = max(self.max_buffer - len(self._buffer), 0)
+            # Keep the newest entries when the buffer can't take them all
+            kept = rows[len(rows) - room :] if room < len(rows) else rows
+            self._dropped += len(rows) - len(kept)
+            self._buffer[:0] = kept
+
+    def _run(self) -> None:
+        failures = 0
+        retry_at = 0.0
+        while True:
+            with self._condition:
+                if failures:
+                    # Back off after a failed insert even when the buffer is full,
+                    # otherwise a database outage turns this into a busy loop
+                    while not self._stopping and (
+                        remaining := retry_at - time.monotonic()
+                    ) > 0:
+                        self._condition.wait(remaining)
+                elif not self._stopping and len(self._buffer) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                rows, self._buffer = self._buffer, []
+                stopping = self._stopping
+            if rows:
+                try:
+                    self._insert(rows)
+                    failures = 0
+                except Exception:
+                    logger.exception("Could not write %d audit log entries", len(rows))
+                    if stopping:
+                        with self._condition:
+                            self._dropped += len(rows)
+                    else:
+                        self._requeue(rows)
+                        failures += 1
+                        delay = self.flush_interval * 2 ** (failures - 1)
+                        retry_at = time.monotonic() + min(delay, MAX_RETRY_DELAY)
+            if stopping:
+                return
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._condition.notify()
+        thread.join()
+        with self._condition:
+            self._thread = None
+            self._stopping = False
+        # Entries logged while the thread was finishing
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        with self._condition:
+            stats: dict[str, Any] = {
+                "running": self._thread is not None,
+                "pending": len(self._buffer),
+                "written": self._written,
+                "batches": self._batches,
+                "dropped": self._dropped,
+            }
+        stats["insert_duration_seconds"] = self.duration.snapshot()
+        return stats
+
+
+audit_log_writer = AuditLogWriter(
+    batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+    flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+    max_buffer=settings.AUDIT_LOG_MAX_BUFFER,
+    synchronous=settings.AUDIT_LOG_SYNC,
+)
+register_collector("audit_log", audit_log_writer.stats)
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_log_p{month:%Y%m}"
+
+
+def create_partitions(connection: Connection, *, start: date, months: int) -> None:
+    """
+    Create the monthly partitions of audit_log from the month of `start` on.
+
+    Rows of a new month that already went to the default partition are moved
+    to the month's partition: Postgres refuses to create it otherwise.
+    """
+    first = start.replace(day=1)
+    for offset in range(months):
+        lower = _add_months(first, offset)
+        upper = _add_months(lower, 1)
+        name = partition_name(lower)
+        exists = connection.execute(
+            select(func.to_regclass(name).is_not(None))
+        ).scalar_one()
+        if exists:
+            continue
+        bounds = {"lower": lower, "upper": upper}
+        in_default = connection.execute(
+            text(
+                f"SELECT count(*) FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= :lower AND created_at < :upper"
+            ),
+            bounds,
+        ).scalar_one()
+        # DDL takes no bind parameters, the values are generated dates
+        if not in_default:
+            connection.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF audit_log "
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                )
+            )
+            continue
+        logger.warning("Moving %d audit log rows from the default partition", in_default)
+        connection.execute(
+            text(f"CREATE TABLE {name} (LIKE audit_log INCLUDING DEFAULTS)")
+        )
+        connection.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+        connection.execute(
+            text(
+                f"ALTER TABLE audit_log ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        )
+
+
+def drop_expired_partitions(connection: Connection, *, before: date) -> list[str]:
+    """Drop the partitions whose whole month is before the month of `before`."""
+    cutoff = before.replace(day=1)
+    names = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_log'::regclass"
+        )
+    ).scalars().all()
+    dropped = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match and date(int(match[1]), int(match[2]), 1) < cutoff:
+            connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    # Expired rows that ended up in the default partition
+    connection.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < :cutoff"),
+        {"cutoff": cutoff},
+    )
+    return dropped
+
+
+def maintain_partitions(now: datetime | None = None) -> None:
+    """
+    Make sure the partitions for the next AUDIT_LOG_PARTITIONS_AHEAD months
+    exist and drop those older than AUDIT_LOG_RETENTION_MONTHS.
+
+    Every worker runs this periodically, the advisory lock lets only one of
+    them do the work at a time.
+    """
+    today = (now or datetime.utcnow()).date()
+    with engine.begin() as connection:
+        locked = connection.execute(
+            select(func.pg_try_advisory_xact_lock(MAINTENANCE_LOCK_ID))
+        ).scalar_one()
+        if not locked:
+            return
+        create_partitions(
+            connection, start=today, months=settings.AUDIT_LOG_PARTITIONS_AHEAD + 1
+        )
+        if settings.AUDIT_LOG_RETENTION_MONTHS > 0:
+            before = _add_months(
+                today.replace(day=1), -settings.AUDIT_LOG_RETENTION_MONTHS
+            )
+            dropped = drop_expired_partitions(connection, before=before)
+            if dropped:
+                logger.info("Dropped audit log partitions %s", ", ".join(dropped))
+
+
+async def run_partition_maintenance() -> None:
+    """Run `maintain_partitions` now and then every maintenance interval."""
+    while True:
+        try:
+            await asyncio.to_thread(maintain_partitions)
+        except Exception:
+            logger.exception("Audit log partition maintenance failed")
+        await asyncio.sleep(settings.AUDIT_LOG_MAINTENANCE_INTERVAL_SECONDS)
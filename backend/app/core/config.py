@@ -35,6 +35,29 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Validated tokens and user snapshots used by get_current_user. The cache is
+    # per worker process, so other workers may serve a changed user for up to
+    # AUTH_CACHE_TTL_SECONDS. Set to 0 to disable.
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_SIZE: int = 10_000
+    # Worker processes for bcrypt, 0 hashes inline in the request thread. Calls
+    # beyond WORKERS + MAX_QUEUE concurrent operations are rejected with a 503.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    # bcrypt work factor (log2 of the iterations). Stored hashes with another
+    # cost are rehashed on the next successful login. Measure the options on
+    # the deployment host with `python -m app.benchmarks.password_hash`.
+    BCRYPT_ROUNDS: int = 12
+    # Rows validated, hashed and inserted together by POST /users/import
+    USER_IMPORT_BATCH_SIZE: int = 500
+    # Larger avatar uploads are rejected with a 413
+    AVATAR_MAX_SIZE_BYTES: int = 5 * 1024 * 1024
+    # Avatars with more pixels are not decoded (decompression bombs)
+    AVATAR_MAX_PIXELS: int = 4096 * 4096
+    # Lifetime of the presigned avatar upload and download URLs
+    AVATAR_URL_EXPIRE_SECONDS: int = 300
+    # Square WebP thumbnails generated for each avatar, in pixels
+    AVATAR_THUMBNAIL_SIZES: list[int] = [64, 128, 256]
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -69,6 +92,42 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Applied to both the sync and the async engine, per worker process:
+    # each worker may open up to 2 * (POOL_SIZE + MAX_OVERFLOW) connections.
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a free connection before raising
+    POSTGRES_POOL_TIMEOUT: float = 30.0
+    # Seconds after which a connection is replaced, -1 disables recycling
+    POSTGRES_POOL_RECYCLE: int = 1800
+    POSTGRES_POOL_PRE_PING: bool = True
+    # Lifetime of list totals requested with count_mode=cached
+    COUNT_CACHE_TTL_SECONDS: int = 10
+    # Audit log entries are buffered per worker and inserted in batches of up to
+    # BATCH_SIZE, at least every FLUSH_INTERVAL seconds. Past MAX_BUFFER waiting
+    # entries, or with AUDIT_LOG_SYNC, each entry is inserted by the request.
+    AUDIT_LOG_BATCH_SIZE: int = 200
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_LOG_MAX_BUFFER: int = 10_000
+    AUDIT_LOG_SYNC: bool = False
+    # audit_log is partitioned by month. Partitions are created this many months
+    # ahead and dropped once older than RETENTION_MONTHS (0 keeps everything),
+    # checked every MAINTENANCE_INTERVAL seconds.
+    AUDIT_LOG_PARTITIONS_AHEAD: int = 3
+    AUDIT_LOG_RETENTION_MONTHS: int = 12
+    AUDIT_LOG_MAINTENANCE_INTERVAL_SECONDS: int = 6 * 60 * 60
+
+    # The bucket is checked in the background at startup: each attempt times out
+    # after SETUP_TIMEOUT seconds and failures are retried with exponential
+    # backoff up to SETUP_MAX_DELAY seconds apart, until MinIO answers.
+    MINIO_SETUP_TIMEOUT_SECONDS: float = 5.0
+    MINIO_SETUP_MAX_DELAY_SECONDS: float = 60.0
+
+    # Send each request's time breakdown (total, SQL, bcrypt, JWT) in a
+    # Server-Timing header. Off by default: bcrypt time tells a client whether
+    # a login email exists. Per-route histograms in /utils/metrics/ are always on.
+    SERVER_TIMING_HEADER: bool = False
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -77,6 +136,17 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str | None = None
     EMAILS_FROM_EMAIL: EmailStr | None = None
     EMAILS_FROM_NAME: EmailStr | None = None
+    # Emails are queued and sent by a background thread, up to BATCH_SIZE at a
+    # time over one SMTP connection that is closed after IDLE_TIMEOUT seconds
+    # without traffic. A failed email is retried after RETRY_DELAY seconds,
+    # doubling each time, MAX_ATTEMPTS times. Past MAX_QUEUE waiting emails, or
+    # with EMAIL_OUTBOX_SYNC, the request sends the email itself.
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_IDLE_TIMEOUT_SECONDS: float = 30.0
+    EMAIL_OUTBOX_RETRY_DELAY_SECONDS: float = 5.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMAIL_OUTBOX_MAX_QUEUE: int = 1000
+    EMAIL_OUTBOX_SYNC: bool = False
 
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
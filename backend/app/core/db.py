@@ -1,10 +1,90 @@
+import time
+from typing import Any
+
+from sqlalchemy import Pool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import Histogram, register_collector
+from app.core.timing import instrument_engine
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+class _CheckoutTimingMixin:
+    """Record how long each checkout waits for a connection (including connect time)."""
+
+    wait_time: Histogram
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+pool_options: dict[str, Any] = {
+    "pool_size": settings.POSTGRES_POOL_SIZE,
+    "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+    "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+    "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+    "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+}
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedQueuePool,
+    **pool_options,
+)
+# psycopg 3 ships an asyncio driver, the same URL resolves to it for async engines.
+# Used by request handlers; scripts (initial_data, backend_pre_start) keep `engine`.
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    **pool_options,
+)
+instrument_engine(engine)
+# Events of an async engine are registered on the sync engine it wraps
+instrument_engine(async_engine.sync_engine)
+
+
+def get_pool_stats(pool: Pool) -> dict[str, Any]:
+    stats: dict[str, Any] = {}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, _CheckoutTimingMixin):
+        stats["wait_time_seconds"] = pool.wait_time.snapshot()
+    return stats
+
+
+# engine.pool is replaced on dispose(), so look it up on every collection
+register_collector(
+    "db_pool",
+    lambda: {
+        "sync": get_pool_stats(engine.pool),
+        "async": get_pool_stats(async_engine.pool),
+    },
+)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, TypeVar
+
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import Histogram, register_collector
+from app.core.timing import timed
+
+T = TypeVar("T")
+
+
+class HashingQueueFull(Exception):
+    """Too many password hashing operations are already running or waiting."""
+
+
+class PasswordHasher:
+    """
+    Run bcrypt hashing and verification in a bounded pool of worker processes.
+
+    Bcrypt is CPU bound on purpose, running it in separate processes keeps a
+    burst of logins from starving the other requests of the worker. At most
+    `max_workers + max_queue` operations are accepted at a time, any further
+    call fails fast with `HashingQueueFull`. With `max_workers=0` the work
+    runs inline in the calling thread.
+    """
+
+    def __init__(self, *, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.duration = Histogram()
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a process that already runs threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HashingQueueFull()
+            self._in_flight += 1
+
+    def _release(self, start: float) -> None:
+        self.duration.observe(time.perf_counter() - start)
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(start)
+            raise
+        future.add_done_callback(lambda _: self._release(start))
+        return future
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with timed("bcrypt"):
+            if self.max_workers <= 0:
+                self._acquire()
+                start = time.perf_counter()
+                try:
+                    return fn(*args)
+                finally:
+                    self._release(start)
+            # Blocks this thread only, the GIL is free while the worker process hashes
+            return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.max_workers <= 0:
+            return self._run(fn, *args)
+        with timed("bcrypt"):
+            return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def hash(self, password: str) -> str:
+        return self._run(security.get_password_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(security.verify_password, plain_password, hashed_password)
+
+    def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return self._run(
+            security.verify_and_update_password, plain_password, hashed_password
+        )
+
+    def hash_many(self, passwords: list[str]) -> list[str]:
+        """
+        Hash `passwords` in parallel on the worker processes, in order.
+
+        At most `max_workers` are submitted at a time so a bulk job never takes
+        the queue slots that logins rely on. When logins fill the queue it waits
+        for its own work, or briefly, and tries again instead of failing.
+        """
+        if self.max_workers <= 0:
+            return [self.hash(password) for password in passwords]
+        with timed("bcrypt"):
+            return self._hash_many(passwords)
+
+    def _hash_many(self, passwords: list[str]) -> list[str]:
+        hashed: list[str] = []
+        pending: deque[Future[str]] = deque()
+        for password in passwords:
+            while True:
+                if len(pending) >= self.max_workers:
+                    hashed.append(pending.popleft().result())
+                try:
+                    pending.append(self._submit(security.get_password_hash, password))
+                    break
+                except HashingQueueFull:
+                    if pending:
+                        hashed.append(pending.popleft().result())
+                    else:
+                        time.sleep(0.05)
+        hashed.extend(future.result() for future in pending)
+        return hashed
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(security.get_password_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(
+            security.verify_password, plain_password, hashed_password
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        stats["duration_seconds"] = self.duration.snapshot()
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+register_collector("password_hasher", password_hasher.stats)
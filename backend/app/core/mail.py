@@ -0,0 +1,263 @@
+import logging
+import threading
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+
+from emails.backend.smtp import SMTPBackend  # type: ignore
+from emails.message import Message
+
+from app.core.config import settings
+from app.core.metrics import Histogram, register_collector
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    email_to: str
+    subject: str
+    html_content: str
+    attempts: int = 0
+    # time.monotonic() before which a failed email is not retried
+    not_before: float = 0.0
+
+
+def smtp_options() -> dict[str, Any]:
+    options: dict[str, Any] = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
+    if settings.SMTP_TLS:
+        options["tls"] = True
+    elif settings.SMTP_SSL:
+        options["ssl"] = True
+    if settings.SMTP_USER:
+        options["user"] = settings.SMTP_USER
+    if settings.SMTP_PASSWORD:
+        options["password"] = settings.SMTP_PASSWORD
+    return options
+
+
+def _close(smtp: SMTPBackend) -> None:
+    # QUIT on a broken connection fails, the socket is dropped anyway
+    with suppress(Exception):
+        smtp.close()
+
+
+class EmailOutbox:
+    """
+    Queue outgoing emails and deliver them from a background thread.
+
+    `send` only appends to a queue, so a slow mail server does not hold up the
+    request. The thread takes up to `batch_size` emails at a time and sends
+    them over one SMTP connection, which is kept open while there is traffic
+    and closed after `idle_timeout` seconds without any. An email that fails
+    is retried after `retry_delay`, doubling on each attempt, and dropped with
+    an error log after `max_attempts`. `stop` sends what is left and must be
+    called on shutdown.
+
+    Like AuditLogWriter, emails are sent right away in the calling thread when
+    the outbox is not running, with `synchronous=True` or when `max_queue`
+    emails are already waiting.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        max_attempts: int,
+        retry_delay: float,
+        idle_timeout: float,
+        max_queue: int,
+        synchronous: bool = False,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.max_queue = max_queue
+        self.synchronous = synchronous
+        self.duration = Histogram()
+        self._queue: list[OutgoingEmail] = []
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+        self._connections = 0
+
+    def send(self, *, email_to: str, subject: str = "", html_content: str = "") -> None:
+        email = OutgoingEmail(
+            email_to=email_to, subject=subject, html_content=html_content
+        )
+        with self._condition:
+            queued = (
+                not self.synchronous
+                and self._thread is not None
+                and len(self._queue) < self.max_queue
+            )
+            if queued:
+                self._queue.append(email)
+                self._condition.notify()
+        if not queued:
+            smtp = self._send_batch(None, [email], final=True)
+            if smtp is not None:
+                _close(smtp)
+
+    def _connect(self) -> SMTPBackend:
+        with self._condition:
+            self._connections += 1
+        # The connection is opened on the first email. Errors are raised instead
+        # of returned so that the email can be retried.
+        return SMTPBackend(fail_silently=False, **smtp_options())
+
+    def _deliver(self, smtp: SMTPBackend, email: OutgoingEmail) -> None:
+        # Only queued when settings.emails_enabled, which requires the sender
+        if not settings.EMAILS_FROM_EMAIL:
+            raise ValueError("EMAILS_FROM_EMAIL is not set")
+        mail_from: tuple[str | None, str] = (
+            settings.EMAILS_FROM_NAME,
+            settings.EMAILS_FROM_EMAIL,
+        )
+        start = time.perf_counter()
+        message = Message(
+            subject=email.subject, html=email.html_content, mail_from=mail_from
+        )
+        response = message.send(to=email.email_to, smtp=smtp)
+        self.duration.observe(time.perf_counter() - start)
+        logger.info(f"send email result: {response}")
+        with self._condition:
+            self._sent += 1
+
+    def _send_batch(
+        self, smtp: SMTPBackend | None, batch: list[OutgoingEmail], *, final: bool
+    ) -> SMTPBackend | None:
+        """Send `batch` over `smtp` (opened if None), returns the connection to reuse."""
+        for index, email in enumerate(batch):
+            if smtp is None:
+                smtp = self._connect()
+            try:
+                self._deliver(smtp, email)
+            except Exception:
+                logger.exception("Could not send email to %s", email.email_to)
+                # The connection may be broken, the next email opens a new one
+                _close(smtp)
+                smtp = None
+                email.attempts += 1
+                if final:
+                    # Nothing will retry them, don't wait for SMTP once per email
+                    self._give_up(batch[index:])
+                    break
+                self._retry(email)
+        return smtp
+
+    def _retry(self, email: OutgoingEmail) -> None:
+        if email.attempts >= self.max_attempts:
+            self._give_up([email])
+            return
+        delay = self.retry_delay * 2 ** (email.attempts - 1)
+        email.not_before = time.monotonic() + delay
+        with self._condition:
+            self._retried += 1
+            self._queue.append(email)
+
+    def _give_up(self, dropped: list[OutgoingEmail]) -> None:
+        for email in dropped:
+            logger.error(
+                "Dropping email to %s after %d attempts", email.email_to, email.attempts
+            )
+        with self._condition:
+            self._failed += len(dropped)
+
+    def _take_due(self) -> list[OutgoingEmail]:
+        # Called with the lock held
+        now = time.monotonic()
+        due: list[OutgoingEmail] = []
+        waiting: list[OutgoingEmail] = []
+        for email in self._queue:
+            if email.not_before <= now and len(due) < self.batch_size:
+                due.append(email)
+            else:
+                waiting.append(email)
+        self._queue = waiting
+        return due
+
+    def _wait_time(self, connected: bool) -> float | None:
+        # Called with the lock held: until the next retry, or the idle timeout
+        # of an open connection. None waits for the next `send`.
+        now = time.monotonic()
+        timeouts = [email.not_before - now for email in self._queue]
+        if connected:
+            timeouts.append(self.idle_timeout)
+        return max(min(timeouts), 0) if timeouts else None
+
+    def _run(self) -> None:
+        smtp: SMTPBackend | None = None
+        while True:
+            with self._condition:
+                batch = self._take_due()
+                if not batch and not self._stopping:
+                    self._condition.wait(self._wait_time(smtp is not None))
+                    batch = self._take_due()
+                stopping = self._stopping
+                if stopping:
+                    # Emails waiting for a retry get one last attempt
+                    batch += self._queue
+                    self._queue = []
+            if not batch and smtp is not None:
+                _close(smtp)
+                smtp = None
+            smtp = self._send_batch(smtp, batch, final=stopping)
+            if stopping:
+                if smtp is not None:
+                    _close(smtp)
+                return
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="email-outbox", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._condition.notify()
+        thread.join()
+        with self._condition:
+            self._thread = None
+            self._stopping = False
+            # Emails queued while the thread was finishing
+            batch, self._queue = self._queue, []
+        smtp = self._send_batch(None, batch, final=True)
+        if smtp is not None:
+            _close(smtp)
+
+    def stats(self) -> dict[str, Any]:
+        with self._condition:
+            stats: dict[str, Any] = {
+                "running": self._thread is not None,
+                "pending": len(self._queue),
+                "sent": self._sent,
+                "retried": self._retried,
+                "failed": self._failed,
+                "connections": self._connections,
+            }
+        stats["send_duration_seconds"] = self.duration.snapshot()
+        return stats
+
+
+email_outbox = EmailOutbox(
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    retry_delay=settings.EMAIL_OUTBOX_RETRY_DELAY_SECONDS,
+    idle_timeout=settings.EMAIL_OUTBOX_IDLE_TIMEOUT_SECONDS,
+    max_queue=settings.EMAIL_OUTBOX_MAX_QUEUE,
+    synchronous=settings.EMAIL_OUTBOX_SYNC,
+)
+register_collector("email_outbox", email_outbox.stats)
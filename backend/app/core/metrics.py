@@ -0,0 +1,79 @@
+import bisect
+import collections
+import threading
+from collections.abc import Callable, Sequence
+from typing import Any
+
+# Seconds, roughly log-spaced from 1ms to 10s
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    In-process histogram with fixed upper bounds, safe to update from threads.
+
+    Snapshots are cumulative like Prometheus buckets: each bound counts every
+    observation less than or equal to it, "+Inf" counts all of them.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative: dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+        return {"count": running, "sum": total, "buckets": cumulative}
+
+
+class Counter:
+    """
+    In-process counter per label, safe to update from threads.
+
+    At most `max_labels` distinct labels are kept, later ones are counted
+    under "other" so that a label taken from user input can't grow it forever.
+    """
+
+    def __init__(self, max_labels: int = 1000) -> None:
+        self.max_labels = max_labels
+        self._counts: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, label: str, amount: int = 1) -> None:
+        with self._lock:
+            if label not in self._counts and len(self._counts) >= self.max_labels:
+                label = "other"
+            self._counts[label] += amount
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {"total": sum(counts.values()), "labels": counts}
+
+
+_collectors: dict[str, Callable[[], Any]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Any]) -> None:
+    """Expose the result of `collector()` under `name` in the metrics endpoint."""
+    _collectors[name] = collector
+
+
+def collect() -> dict[str, Any]:
+    return {name: collector() for name, collector in _collectors.items()}
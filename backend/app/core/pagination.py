@@ -0,0 +1,162 @@
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Any, Literal, TypeVar
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Select,
+    TypeDecorator,
+    cast,
+    column,
+    func,
+    literal,
+    table,
+    tuple_,
+)
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+T = TypeVar("T")
+SelectT = TypeVar("SelectT", bound=Select[Any])
+
+# How list endpoints compute `count`:
+# - exact: a separate COUNT(*) query (default)
+# - window: COUNT(*) OVER () on the page query itself, one round trip. Pages
+#   after a cursor fall back to exact: the window would only count the rows
+#   after the cursor, not the whole listing.
+# - estimate: planner statistics from pg_class.reltuples, only for unfiltered
+#   listings, filtered ones fall back to exact
+# - cached: an exact count reused for COUNT_CACHE_TTL_SECONDS
+CountMode = Literal["exact", "window", "estimate", "cached"]
+
+count_cache: TTLCache[str, int] = TTLCache(
+    maxsize=1024, ttl=settings.COUNT_CACHE_TTL_SECONDS
+)
+pg_class = table("pg_class", column("oid"), column("reltuples"))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque, URL safe cursor holding the sort key of the last row of a page."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else str(v) for v in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> list[Any]:
+    """Inverse of `encode_cursor`, raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [
+            _parse_value(type_, value)
+            for type_, value in zip(types, values, strict=True)
+        ]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _parse_value(type_: type, value: str) -> Any:
+    if type_ is datetime:
+        return datetime.fromisoformat(value)
+    if type_ is uuid.UUID:
+        return uuid.UUID(value)
+    return type_(value)
+
+
+def _python_type(column: ColumnElement[Any]) -> type:
+    type_ = column.type
+    if isinstance(type_, TypeDecorator):
+        type_ = type_.impl_instance
+    return type_.python_type
+
+
+def key_columns(*attributes: Any) -> tuple[ColumnElement[Any], ...]:
+    """
+    Sort key for `paginate_by_keyset` from model attributes, e.g.
+    `key_columns(Item.created_at, Item.id)`. SQLModel types those attributes as
+    their Python values, this returns the underlying columns.
+    """
+    return tuple(attribute.__clause_element__() for attribute in attributes)
+
+
+def paginate_by_keyset(
+    statement: SelectT,
+    key: Sequence[ColumnElement[Any]],
+    cursor: str | None,
+    limit: int,
+    *,
+    descending: bool = False,
+) -> SelectT:
+    """
+    Order `statement` by `key` and keep the rows after `cursor`.
+
+    One extra row is fetched so `split_page` can tell whether a next page
+    exists. `key` must be unique per row, e.g. end with the primary key.
+    """
+    if cursor:
+        values = decode_cursor(cursor, [_python_type(column) for column in key])
+        # Bind each value with the type of its column so Postgres compares like types
+        bound = [
+            literal(value, column.type)
+            for column, value in zip(key, values, strict=True)
+        ]
+        if descending:
+            statement = statement.where(tuple_(*key) < tuple_(*bound))
+        else:
+            statement = statement.where(tuple_(*key) > tuple_(*bound))
+    order = [column.desc() for column in key] if descending else key
+    return statement.order_by(*order).limit(limit + 1)
+
+
+def split_page(
+    rows: Sequence[T], limit: int, key: Callable[[T], Sequence[Any]]
+) -> tuple[list[T], str | None]:
+    """Trim the look-ahead row of a keyset query and build the next cursor."""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_cursor(key(page[-1]))
+
+
+async def count_rows(
+    session: AsyncSession,
+    statement: SelectOfScalar[int],
+    *,
+    mode: CountMode,
+    cache_key: str,
+    estimate_table: str | None = None,
+) -> int:
+    """
+    Run the COUNT `statement` according to `mode` (see CountMode).
+
+    `estimate_table` must only be passed when the count is unfiltered, and
+    `cache_key` must identify the filters of the count.
+    """
+    if mode == "estimate" and estimate_table:
+        estimate_statement = select(cast(pg_class.c.reltuples, BigInteger)).where(
+            pg_class.c.oid == func.to_regclass(func.quote_ident(estimate_table))
+        )
+        estimate = (await session.exec(estimate_statement)).first()
+        # -1 until the table has been vacuumed or analyzed once
+        if estimate is not None and estimate >= 0:
+            return estimate
+    if mode == "cached":
+        cached = count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    count = (await session.exec(statement)).one()
+    if mode == "cached":
+        count_cache.set(cache_key, count)
+    return count
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import Histogram, register_collector
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestTimings:
+    """Time and number of calls per category ("db", "bcrypt", "jwt") of one request."""
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        # Sync routes run in a worker thread, background work may add to it too
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def server_timing(self, total: float) -> str:
+        """Value of the Server-Timing header, durations in milliseconds."""
+        with self._lock:
+            entries = [f"total;dur={total * 1000:.1f}"]
+            for name, seconds in self.durations.items():
+                entry = f"{name};dur={seconds * 1000:.1f}"
+                if name == "db":
+                    entry += f';desc="{self.counts[name]} queries"'
+                entries.append(entry)
+        return ", ".join(entries)
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add `seconds` to `name` for the current request, no-op outside a request."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the time of every query run on `engine` as "db"."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn: Any, *_args: Any) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn: Any, *_args: Any) -> None:
+        record("db", time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context: Any) -> None:
+        # after_cursor_execute is not called when the query fails
+        starts = (
+            context.connection.info.get("query_start") if context.connection else None
+        )
+        if starts:
+            record("db", time.perf_counter() - starts.pop())
+
+
+class RouteTimings:
+    """Histograms of request time, SQL time and query count per route."""
+
+    def __init__(self) -> None:
+        self._routes: dict[str, dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, total: float, timings: RequestTimings) -> None:
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    "total_seconds": Histogram(),
+                    "db_seconds": Histogram(),
+                    "queries": Histogram(QUERY_COUNT_BUCKETS),
+                }
+        histograms["total_seconds"].observe(total)
+        histograms["db_seconds"].observe(timings.durations.get("db", 0.0))
+        histograms["queries"].observe(timings.counts.get("db", 0))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            routes = dict(self._routes)
+        return {
+            route: {
+                name: histogram.snapshot() for name, histogram in histograms.items()
+            }
+            for route, histograms in routes.items()
+        }
+
+
+route_timings = RouteTimings()
+register_collector("routes", route_timings.snapshot)
+
+
+class TimingMiddleware:
+    """
+    Time each HTTP request and what it spends in SQL, bcrypt and JWT.
+
+    The time until the response starts is recorded per route template in
+    `route_timings`. With SERVER_TIMING_HEADER the breakdown is also sent in
+    a Server-Timing header, which browsers show in their network panel.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        total: float | None = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal total
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                if settings.SERVER_TIMING_HEADER:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # FastAPI puts the matched route in the scope, unmatched paths
+            # share one entry so that random URLs can't add routes
+            route = scope.get("route")
+            name = f"{scope['method']} {route.path}" if route else "unmatched"
+            if total is None:
+                total = time.perf_counter() - start
+            route_timings.observe(name, total, timings)
@@ -1,17 +1,25 @@
 import uuid
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
 from typing import Any
 
-from sqlmodel import Session, select, func
-from sqlalchemy.orm import joinedload
+from pydantic import ValidationError
+from sqlmodel import Session, col, delete, select, func, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Row, false, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.core.security import get_password_hash, verify_password
-from app.models import UserBase,UnitRead,UnitUser,Item, ItemCreate, User, UserCreate, UserUpdate, UnitCreate, Unit, UnitFilterRequest,AuditLogCreate, AuditLog
+from app.core.cache import invalidate_user
+from app.core import db
+from app.core.hashing import password_hasher
+from app.core.pagination import key_columns, paginate_by_keyset, split_page
+from app.models import UserBase,UnitRead,UnitUser,Item, ItemCreate, User, UserCreate, UserUpdate, UnitCreate, Unit, UnitFilterRequest, AuditLog, UnitsPublic, AuditLogFilter, AuditLogsPublic, UserImportReport, UserImportResult
 
 from app.utils import strip_accents
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
     db_obj = User.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
+        user_create, update={"hashed_password": password_hasher.hash(user_create.password)}
     )
     session.add(db_obj)
     session.commit()
@@ -24,11 +32,12 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     extra_data = {}
     if "password" in user_data:
         password = user_data["password"]
-        hashed_password = get_password_hash(password)
+        hashed_password = password_hasher.hash(password)
         extra_data["hashed_password"] = hashed_password
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
+    invalidate_user(db_user.id)
     session.refresh(db_user)
     return db_user
 
@@ -43,11 +52,102 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    verified, new_hash = password_hasher.verify_and_update(
+        password, db_user.hashed_password
+    )
+    if not verified:
         return None
+    if new_hash:
+        # Hash made with an outdated scheme or BCRYPT_ROUNDS, upgrade it while
+        # the plain password is at hand
+        db_user.hashed_password = new_hash
+        session.add(db_user)
+        session.commit()
+        invalidate_user(db_user.id)
+        session.refresh(db_user)
     return db_user
 
 
+def import_users(
+    *, session: Session, records: Iterable[dict[str, Any] | str], batch_size: int
+) -> UserImportReport:
+    """
+    Create users from `records`, each a raw row or an error message for a row
+    that could not be parsed. Rows are processed `batch_size` at a time: one
+    query finds the emails already taken, the passwords are hashed in parallel
+    and the new users inserted with one multi-row INSERT and committed.
+    """
+    results: list[UserImportResult] = []
+    seen: set[str] = set()
+    batch: list[tuple[int, UserCreate]] = []
+
+    def flush() -> None:
+        existing = set(
+            session.exec(
+                select(User.email).where(User.email.in_([user.email for _, user in batch]))
+            ).all()
+        )
+        new = [(row, user) for row, user in batch if user.email not in existing]
+        for row, user in batch:
+            if user.email in existing:
+                results.append(UserImportResult(row=row, email=user.email, status="exists"))
+        hashed = password_hasher.hash_many([user.password for _, user in new])
+        rows = [
+            User.model_validate(user, update={"hashed_password": hashed_password}).model_dump()
+            for (_, user), hashed_password in zip(new, hashed)
+        ]
+        created: set[str] = set()
+        if rows:
+            # Một email vừa được tạo bởi request khác thì bỏ qua thay vì lỗi cả batch
+            stmt = (
+                pg_insert(User)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.email)
+            )
+            created = set(session.execute(stmt, rows).scalars().all())
+            session.commit()
+        for row, user in new:
+            status = "created" if user.email in created else "exists"
+            results.append(UserImportResult(row=row, email=user.email, status=status))
+        batch.clear()
+
+    for row, record in enumerate(records, start=1):
+        if isinstance(record, str):
+            results.append(UserImportResult(row=row, status="invalid", error=record))
+            continue
+        try:
+            user_in = UserCreate.model_validate(record)
+        except ValidationError as e:
+            email = record.get("email")
+            results.append(
+                UserImportResult(
+                    row=row,
+                    email=email if isinstance(email, str) else None,
+                    status="invalid",
+                    error="; ".join(
+                        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+            )
+            continue
+        if user_in.email in seen:
+            results.append(UserImportResult(row=row, email=user_in.email, status="duplicate"))
+            continue
+        seen.add(user_in.email)
+        batch.append((row, user_in))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    results.sort(key=lambda result: result.row)
+    created_count = sum(result.status == "created" for result in results)
+    return UserImportReport(
+        created=created_count, failed=len(results) - created_count, results=results
+    )
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
@@ -55,33 +155,277 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.refresh(db_item)
     return db_item
 
-def create_unit(*, session: Session, unit_create: UnitCreate, creator: uuid.UUID) -> Item:
-    db_unit = Unit.model_validate(unit_create, update={"created_by": creator})
-    session.add(db_unit)
-    session.commit()
-    session.refresh(db_unit)
-    return db_unit
+def _missing_user_ids(session: Session, user_ids: set[uuid.UUID]) -> set[uuid.UUID]:
+    if not user_ids:
+        return set()
+    existing = session.exec(select(User.id).where(User.id.in_(user_ids))).all()
+    return user_ids - set(existing)
+
+
+def _missing_users_error(missing_ids: set[uuid.UUID]) -> ValueError:
+    return ValueError(f"Các user_id sau không tồn tại: {', '.join(str(i) for i in missing_ids)}")
+
+
+def check_unit_users(*, session: Session, units_create: list[UnitCreate]) -> None:
+    """Kiểm tra leader và thành viên của các unit đều tồn tại, chỉ một truy vấn."""
+    user_ids = {
+        user_id
+        for unit_create in units_create
+        for user_id in (unit_create.leader_id, *unit_create.member_ids)
+    }
+    missing_ids = _missing_user_ids(session, user_ids)
+    for unit_create in units_create:
+        if unit_create.leader_id in missing_ids:
+            raise ValueError(f"User với id {unit_create.leader_id} (leader_id) không tồn tại.")
+    if missing_ids:
+        raise _missing_users_error(missing_ids)
+
+
+def _member_rows(
+    unit_id: uuid.UUID,
+    user_ids: list[uuid.UUID],
+    leader_id: uuid.UUID | None,
+    updated_by: uuid.UUID,
+    now: datetime,
+) -> list[dict[str, Any]]:
+    """Các dòng unit_user cho một unit."""
+    return [
+        {
+            "id": uuid.uuid4(),
+            "unit_id": unit_id,
+            "user_id": user_id,
+            "is_leader": user_id == leader_id,
+            "updated_at": now,
+            "updated_by": updated_by,
+        }
+        # Bỏ các user_id trùng, giữ thứ tự
+        for user_id in dict.fromkeys(user_ids)
+    ]
+
+
+def _insert_member_rows(session: Session, rows: list[dict[str, Any]]) -> None:
+    """Một câu INSERT nhiều dòng, bỏ qua người đã là thành viên."""
+    if not rows:
+        return
+    session.execute(
+        pg_insert(UnitUser).on_conflict_do_nothing(constraint="uq_unit_user"), rows
+    )
+
+
+def _insert_members(
+    session: Session,
+    unit_id: uuid.UUID,
+    user_ids: list[uuid.UUID],
+    leader_id: uuid.UUID | None,
+    updated_by: uuid.UUID,
+    now: datetime,
+) -> None:
+    """Thêm thành viên vào một unit bằng một câu INSERT nhiều dòng."""
+    _insert_member_rows(
+        session, _member_rows(unit_id, user_ids, leader_id, updated_by, now)
+    )
+
+
+def create_units(
+    *, session: Session, units_create: list[UnitCreate], creator: uuid.UUID
+) -> list[uuid.UUID]:
+    """
+    Tạo các unit bằng một câu INSERT nhiều dòng, rồi thành viên của tất cả các
+    unit bằng một câu INSERT nhiều dòng nữa.
+
+    Không commit, caller commit một lần cho cả transaction.
+    """
+    now = datetime.utcnow()
+    # Validate qua model Unit (độ dài name, description) như khi tạo từng unit,
+    # câu INSERT thô bên dưới không tự kiểm tra
+    unit_rows = [
+        Unit.model_validate(
+            unit_create, update={"created_at": now, "created_by": creator}
+        ).model_dump()
+        for unit_create in units_create
+    ]
+    check_unit_users(session=session, units_create=units_create)
+    session.execute(insert(Unit), unit_rows)
+    member_rows = [
+        row
+        for unit_row, unit_create in zip(unit_rows, units_create, strict=True)
+        # Leader đứng đầu
+        for row in _member_rows(
+            unit_row["id"],
+            [unit_create.leader_id, *unit_create.member_ids],
+            unit_create.leader_id,
+            creator,
+            now,
+        )
+    ]
+    _insert_member_rows(session, member_rows)
+    return [unit_row["id"] for unit_row in unit_rows]
+
+
+def create_unit(*, session: Session, unit_create: UnitCreate, creator: uuid.UUID) -> uuid.UUID:
+    """Tạo một unit, xem create_units."""
+    return create_units(session=session, units_create=[unit_create], creator=creator)[0]
+
+
+def set_unit_leader(
+    *,
+    session: Session,
+    unit_id: uuid.UUID,
+    leader_id: uuid.UUID | None,
+    updated_by: uuid.UUID,
+    now: datetime | None = None,
+) -> None:
+    """
+    Đặt leader của unit (None: không có leader) bằng một câu UPDATE, chỉ những
+    dòng có cờ is_leader thay đổi mới bị ghi.
+    """
+    is_leader = UnitUser.user_id == leader_id if leader_id else false()
+    stmt = (
+        update(UnitUser)
+        .where(UnitUser.unit_id == unit_id, UnitUser.is_leader != is_leader)
+        .values(is_leader=is_leader, updated_by=updated_by, updated_at=now or datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(stmt)
+
+
+def update_unit_members(
+    *,
+    session: Session,
+    unit_id: uuid.UUID,
+    user_ids: list[uuid.UUID],
+    leader_id: uuid.UUID | None,
+    updated_by: uuid.UUID,
+) -> None:
+    """
+    Đưa danh sách thành viên của unit về `user_ids`: chỉ xóa người bị bỏ, thêm
+    người mới và đổi cờ leader, các dòng không đổi giữ nguyên updated_at.
+    """
+    current = set(
+        session.exec(select(UnitUser.user_id).where(UnitUser.unit_id == unit_id)).all()
+    )
+    desired = dict.fromkeys(user_ids)
+    added = [user_id for user_id in desired if user_id not in current]
+    missing_ids = _missing_user_ids(session, set(added))
+    if missing_ids:
+        raise _missing_users_error(missing_ids)
+
+    removed = current - desired.keys()
+    if removed:
+        session.exec(
+            delete(UnitUser).where(
+                UnitUser.unit_id == unit_id, UnitUser.user_id.in_(removed)
+            )
+        )
+    now = datetime.utcnow()
+    _insert_members(session, unit_id, added, leader_id, updated_by, now)
+    set_unit_leader(
+        session=session, unit_id=unit_id, leader_id=leader_id, updated_by=updated_by, now=now
+    )
+
 
-def filter_units(session: Session, filters: UnitFilterRequest):
-    stmt = select(Unit).options(joinedload(Unit.members))
+def add_unit_members(
+    *, session: Session, unit_id: uuid.UUID, user_ids: list[uuid.UUID], updated_by: uuid.UUID
+) -> None:
+    """Thêm thành viên (không phải leader), người đã là thành viên được bỏ qua."""
+    missing_ids = _missing_user_ids(session, set(user_ids))
+    if missing_ids:
+        raise _missing_users_error(missing_ids)
+    _insert_members(session, unit_id, user_ids, None, updated_by, datetime.utcnow())
+
+
+def remove_unit_members(
+    *, session: Session, unit_id: uuid.UUID, user_ids: list[uuid.UUID]
+) -> None:
+    """Xóa thành viên khỏi unit, không cho xóa leader."""
+    if not user_ids:
+        return
+    leader_ids = session.exec(
+        select(UnitUser.user_id).where(
+            UnitUser.unit_id == unit_id, col(UnitUser.is_leader).is_(True)
+        )
+    ).all()
+    if set(leader_ids) & set(user_ids):
+        raise ValueError("Không thể xóa leader khỏi Unit, hãy đổi leader trước")
+    session.exec(
+        delete(UnitUser).where(UnitUser.unit_id == unit_id, UnitUser.user_id.in_(user_ids))
+    )
+
+
+def unit_name_matches(name: str):
+    """
+    Điều kiện tìm unit theo tên, không phân biệt hoa thường và dấu.
+
+    Biểu thức phải giống hệt index ix_unit_name_unaccent_trgm (GIN pg_trgm) thì
+    Postgres mới dùng được index thay vì quét toàn bảng.
+    """
+    keyword = strip_accents(name).lower()
+    # Escape ký tự đại diện của LIKE để tìm đúng chuỗi người dùng nhập
+    keyword = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return func.immutable_unaccent(func.lower(Unit.name)).ilike(
+        f"%{keyword}%", escape="\\"
+    )
+
+
+# Khóa sắp xếp ổn định cho phân trang theo cursor, dùng index ix_unit_created_at_id
+UNIT_PAGE_KEY = key_columns(Unit.created_at, Unit.id)
+
+
+def _filter_units_statement(filters: UnitFilterRequest):
+    # Số member đếm bằng subquery tương quan theo từng unit (dùng index
+    # uq_unit_user), chỉ tính cho các unit của trang, không load UnitUser
+    member_count = (
+        select(func.count(UnitUser.id))
+        .where(UnitUser.unit_id == Unit.id)
+        .correlate(Unit)
+        .scalar_subquery()
+    )
+    # Leader lấy luôn trong cùng câu query. Chọn bằng subquery tương quan (dùng
+    # index ix_unit_user_leader) chứ không join thẳng unit_user: lỡ một unit có
+    # hai dòng is_leader thì unit cũng không bị lặp, phân trang không hỏng
+    leader_id = (
+        select(UnitUser.user_id)
+        .where(col(UnitUser.unit_id) == Unit.id, col(UnitUser.is_leader).is_(True))
+        .order_by(col(UnitUser.user_id))
+        .limit(1)
+        .correlate(Unit)
+        .scalar_subquery()
+    )
+    stmt = select(Unit, member_count, User).outerjoin(User, col(User.id) == leader_id)
 
     # Tìm kiếm theo tên không phân biệt chữ hoa + dấu
     if filters.name:
-        keyword = strip_accents(filters.name).lower()
-        stmt = stmt.where(
-            func.unaccent(func.lower(Unit.name)).ilike(f"%{keyword}%")
-        )
+        stmt = stmt.where(unit_name_matches(filters.name))
 
     # Lọc theo danh sách created_by (nếu có)
     if filters.created_by:
         stmt = stmt.where(Unit.created_by.in_(filters.created_by))
 
-    # Lọc theo leader (trong bảng phụ UnitUser, phải join)
+    # Lọc theo leader
     if filters.leader_id:
-        stmt = stmt.join(Unit.members).where(
-            UnitUser.user_id.in_(filters.leader_id),
-            UnitUser.is_leader == True
+        stmt = stmt.where(
+            col(Unit.id).in_(
+                select(UnitUser.unit_id).where(
+                    col(UnitUser.is_leader).is_(True),
+                    col(UnitUser.user_id).in_(filters.leader_id),
+                )
+            )
         )
+    return stmt
+
+
+def _to_unit_read(unit: Unit, member_count: int, leader: User | None) -> UnitRead:
+    return UnitRead.model_validate(
+        unit,
+        update={
+            "member_count": member_count,
+            "leader": UserBase.model_validate(leader) if leader else None,
+        },
+    )
+
+
+async def filter_units(session: AsyncSession, filters: UnitFilterRequest):
+    stmt = _filter_units_statement(filters)
 
     # Phân trang
     page = max(filters.page or 1, 1)
@@ -89,27 +433,79 @@ def filter_units(session: Session, filters: UnitFilterRequest):
     offset = (page - 1) * page_size
 
     stmt = stmt.offset(offset).limit(page_size)
-    results = session.exec(stmt).unique().all()
+    results = (await session.exec(stmt)).all()
 
-    enriched_units = []
+    return [_to_unit_read(*row) for row in results]
 
-    for unit in results:
-        unit_read = UnitRead.from_orm(unit)
 
-        # Đếm số member
-        unit_read.member_count = len(unit.members)
+async def filter_units_page(
+    session: AsyncSession, filters: UnitFilterRequest
+) -> UnitsPublic:
+    """
+    Like filter_units but paginated by (created_at, id) with an opaque cursor,
+    so deep pages cost the same as the first one. Raises ValueError for an
+    invalid cursor.
+    """
+    page_size = min(filters.page_size or 20, 100)
+    stmt = paginate_by_keyset(
+        _filter_units_statement(filters), UNIT_PAGE_KEY, filters.cursor, page_size
+    )
+    results = (await session.exec(stmt)).all()
 
-        # Tìm leader
-        leader_link = next((m for m in unit.members if m.is_leader), None)
-        if leader_link and leader_link.user:
-            unit_read.leader = UserBase.from_orm(leader_link.user)
+    rows, next_cursor = split_page(
+        results, page_size, lambda row: (row[0].created_at, row[0].id)
+    )
+    return UnitsPublic(
+        data=[_to_unit_read(*row) for row in rows], next_cursor=next_cursor
+    )
 
-        enriched_units.append(unit_read)
-    return enriched_units
 
-def create_log(*, session: Session, log_create: AuditLogCreate) -> Item:
-    db_log = AuditLog.model_validate(log_create)
-    session.add(db_log)
-    session.commit()
-    session.refresh(db_log)
-    return db_log
\ No newline at end of file
+# Log mới nhất trước, id để thứ tự ổn định khi trùng created_at
+AUDIT_LOG_PAGE_KEY = key_columns(AuditLog.created_at, AuditLog.id)
+
+
+def audit_logs_statement(filters: AuditLogFilter):
+    """
+    Câu truy vấn audit log theo bộ lọc. Lọc theo khoảng created_at giúp Postgres
+    chỉ đọc các partition tháng liên quan.
+    """
+    stmt = select(AuditLog)
+    if filters.created_by:
+        stmt = stmt.where(AuditLog.created_by.in_(filters.created_by))
+    if filters.status:
+        stmt = stmt.where(AuditLog.status == filters.status)
+    if filters.created_from:
+        stmt = stmt.where(AuditLog.created_at >= filters.created_from)
+    if filters.created_to:
+        stmt = stmt.where(AuditLog.created_at < filters.created_to)
+    return stmt
+
+
+async def read_audit_logs_page(
+    *, session: AsyncSession, filters: AuditLogFilter, cursor: str | None, limit: int
+) -> AuditLogsPublic:
+    """Một trang audit log, mới nhất trước. Cursor không hợp lệ -> ValueError."""
+    stmt = paginate_by_keyset(
+        audit_logs_statement(filters), AUDIT_LOG_PAGE_KEY, cursor, limit, descending=True
+    )
+    logs = (await session.exec(stmt)).all()
+    page, next_cursor = split_page(logs, limit, lambda log: (log.created_at, log.id))
+    return AuditLogsPublic(data=page, next_cursor=next_cursor)
+
+
+async def stream_audit_logs(
+    *, filters: AuditLogFilter, chunk_size: int = 1000
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """
+    Đọc audit log theo bộ lọc, cũ nhất trước, từng khối `chunk_size` dòng.
+
+    Dùng server-side cursor trên kết nối riêng (session của request đã đóng khi
+    response bắt đầu stream), bộ nhớ không phụ thuộc số dòng.
+    """
+    stmt = audit_logs_statement(filters).order_by(*AUDIT_LOG_PAGE_KEY)
+    async with db.async_engine.connect() as connection:
+        result = await connection.stream(
+            stmt.execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions():
+            yield rows
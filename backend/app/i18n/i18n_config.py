@@ -1,10 +1,75 @@
-import i18n
+import sys
+from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any
 
-def setup_i18n():
-    locale_dir = Path(__file__).parent / "locales"
-    i18n.load_path.append(str(locale_dir))
-    i18n.set("locale", "vi")  # Ngôn ngữ mặc định
-    i18n.set("fallback", "en")
-    i18n.set("filename_format", "{locale}.yaml")
-    i18n.set("format", "yaml")
\ No newline at end of file
+import yaml
+
+LOCALE_DIR = Path(__file__).parent / "locales"
+DEFAULT_LOCALE = "vi"  # Ngôn ngữ mặc định
+FALLBACK_LOCALE = "en"
+
+Catalog = Mapping[str, Mapping[str, str]]
+
+
+def _flatten(tree: dict[str, Any], prefix: str = "") -> dict[str, str]:
+    """{"unit": {"created": "..."}} -> {"unit.created": "..."}"""
+    flat: dict[str, str] = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = str(value)
+    return flat
+
+
+def load_catalog(locale_dir: Path = LOCALE_DIR) -> dict[str, dict[str, str]]:
+    """Đọc toàn bộ locales/{locale}.yaml thành dict phẳng theo từng locale."""
+    catalog: dict[str, dict[str, str]] = {}
+    for path in sorted(locale_dir.glob("*.yaml")):
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        # Như python-i18n: nội dung file nằm dưới key gốc là tên locale
+        catalog[path.stem] = _flatten(data.get(path.stem) or {})
+    return catalog
+
+
+def validate_catalog(catalog: Catalog) -> None:
+    """
+    ValueError nếu thiếu locale mặc định/fallback, hoặc một locale có key mà
+    FALLBACK_LOCALE không có (khi đó không còn gì để fallback).
+    """
+    for locale in (DEFAULT_LOCALE, FALLBACK_LOCALE):
+        if locale not in catalog:
+            raise ValueError(f"Thiếu file {locale}.yaml")
+    errors = [
+        f"{locale}: {', '.join(sorted(missing))}"
+        for locale, messages in catalog.items()
+        if (missing := messages.keys() - catalog[FALLBACK_LOCALE].keys())
+    ]
+    if errors:
+        raise ValueError(
+            f"Key không có trong {FALLBACK_LOCALE}.yaml: " + "; ".join(errors)
+        )
+
+
+def compile_catalog(locale_dir: Path = LOCALE_DIR) -> Catalog:
+    """Catalog đã kiểm tra, chỉ đọc: request chỉ tra dict, không sửa được state chung."""
+    catalog = load_catalog(locale_dir)
+    validate_catalog(catalog)
+    return MappingProxyType(
+        {locale: MappingProxyType(messages) for locale, messages in catalog.items()}
+    )
+
+
+# Biên dịch một lần khi import: locale sai thì app không khởi động được
+catalog = compile_catalog()
+
+
+if __name__ == "__main__":
+    # Kiểm tra lúc build/CI: python -m app.i18n.i18n_config
+    try:
+        validate_catalog(load_catalog())
+    except ValueError as e:
+        sys.exit(str(e))
+    print("Locales OK")
@@ -1,10 +1,44 @@
-from app.i18n import i18n_config
-import i18n
-
-def translate(key: str, lang: str = "vi", **kwargs) -> str:
-    i18n.set("locales", lang)
-    i18n.set("fallback", "en")
-    value = i18n.t(key)
-    if not value or key in value:
-        print(f"[i18n] ⚠️ Không tìm thấy key: {key} trong ngôn ngữ {lang}")
+import re
+
+from app.core.metrics import Counter, register_collector
+from app.i18n.i18n_config import DEFAULT_LOCALE, FALLBACK_LOCALE, catalog
+
+PLACEHOLDER = re.compile(r"%\{(\w+)\}")
+
+# Số lần tra key không có trong ngôn ngữ được yêu cầu, theo "lang:key"
+missing_keys = Counter()
+register_collector("i18n", lambda: {"missing_keys": missing_keys.snapshot()})
+
+
+def translate(key: str, lang: str = DEFAULT_LOCALE, **kwargs) -> str:
+    value = catalog.get(lang, {}).get(key)
+    if value is None:
+        missing_keys.inc(f"{lang}:{key}")
+        value = catalog[FALLBACK_LOCALE].get(key, key)
+    if kwargs:
+        # Placeholder dạng %{name} như python-i18n
+        value = PLACEHOLDER.sub(lambda m: str(kwargs.get(m[1], m[0])), value)
     return value
+
+
+def resolve_locale(accept_language: str | None, user_lang: str | None = None) -> str:
+    """
+    Ngôn ngữ cho một request: ngôn ngữ user đã chọn, sau đó tới header
+    Accept-Language (theo q), cuối cùng là DEFAULT_LOCALE.
+    """
+    if user_lang in catalog:
+        return user_lang
+    candidates = []
+    for index, part in enumerate((accept_language or "").split(",")):
+        tag, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        # "vi-VN" -> "vi"
+        language = tag.split("-")[0].lower()
+        if language in catalog and quality > 0:
+            candidates.append((-quality, index, language))
+    return min(candidates)[2] if candidates else DEFAULT_LOCALE
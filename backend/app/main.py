@@ -1,14 +1,21 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.audit import audit_log_writer, run_partition_maintenance
 from app.core.config import settings
-
-from app.i18n.i18n_config import setup_i18n
-from app.minio.minio_config import setup_minio_bucket
-import i18n
+from app.core.hashing import HashingQueueFull, password_hasher
+from app.core.mail import email_outbox
+from app.core.timing import TimingMiddleware
+from app.minio.minio_config import ensure_minio_bucket
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -18,14 +25,43 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    load_email_templates()
+    audit_log_writer.start()
+    email_outbox.start()
+    maintenance = asyncio.create_task(run_partition_maintenance())
+    # Không chờ MinIO: thiếu storage thì API vẫn chạy, health check báo degraded
+    minio_setup = asyncio.create_task(ensure_minio_bucket())
+    yield
+    for task in (maintenance, minio_setup):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    email_outbox.stop()
+    audit_log_writer.stop()
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
-setup_i18n()
-setup_minio_bucket()
+
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full_handler(
+    _request: Request, _exc: HashingQueueFull
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, retry later"},
+        headers={"Retry-After": "1"},
+    )
+
 
 # Set all CORS enabled origins
 if settings.all_cors_origins:
@@ -37,4 +73,7 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Added last so it is the outermost middleware and times everything below it
+app.add_middleware(TimingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
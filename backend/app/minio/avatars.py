@@ -0,0 +1,151 @@
+# app/minio/avatars.py
+import hashlib
+import io
+import logging
+from collections.abc import Collection
+from pathlib import PurePosixPath
+
+from minio.error import S3Error
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.minio.minio_config import MINIO_BUCKET, get_minio_client
+from app.minio.minio_utils import LimitedReader, SizeLimitExceeded, stat_file
+
+
+def thumbnail_name(object_name: str, size: int) -> str:
+    """Thumbnail nằm cạnh ảnh gốc: avatars/<user>/<id>.png -> avatars/<user>/<id>_128.webp"""
+    stem = PurePosixPath(object_name).with_suffix("")
+    return f"{stem}_{size}.webp"
+
+
+class InvalidAvatar(Exception):
+    """Avatar quá lớn (byte hoặc pixel) để tạo thumbnail."""
+
+
+def _read_avatar(object_name: str) -> bytes:
+    """Đọc ảnh gốc, từ chối ảnh lớn hơn AVATAR_MAX_SIZE_BYTES trước khi tải về."""
+    max_size = settings.AVATAR_MAX_SIZE_BYTES
+    stat = stat_file(object_name)
+    if stat.size is not None and stat.size > max_size:
+        raise InvalidAvatar(f"{object_name} is {stat.size} bytes")
+    response = get_minio_client().get_object(
+        bucket_name=MINIO_BUCKET, object_name=object_name
+    )
+    try:
+        # Object có thể bị ghi đè sau stat_object, vẫn giới hạn khi đọc
+        return LimitedReader(response, max_size).read()
+    except SizeLimitExceeded:
+        raise InvalidAvatar(f"{object_name} is larger than {max_size} bytes")
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def _open_square(object_name: str) -> Image.Image:
+    """Ảnh gốc đã xoay theo EXIF và cắt vuông ở giữa."""
+    try:
+        original = Image.open(io.BytesIO(_read_avatar(object_name)))
+    except Image.DecompressionBombError:
+        raise InvalidAvatar(f"{object_name} has too many pixels")
+    with original:
+        # Image.open chỉ đọc header, kiểm tra trước khi giải nén
+        if original.width * original.height > settings.AVATAR_MAX_PIXELS:
+            raise InvalidAvatar(f"{object_name} is {original.width}x{original.height}")
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    side = min(image.size)
+    left, top = (image.width - side) // 2, (image.height - side) // 2
+    return image.crop((left, top, left + side, top + side))
+
+
+def _shrink(image: Image.Image, size: int) -> Image.Image:
+    if size < image.width:
+        return image.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return image
+
+
+def _save_thumbnail(
+    object_name: str, image: Image.Image, size: int
+) -> tuple[bytes, str]:
+    """Upload `image` làm thumbnail `size`, trả về (nội dung, etag)."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=80, method=4)
+    content = buffer.getvalue()
+    result = get_minio_client().put_object(
+        bucket_name=MINIO_BUCKET,
+        object_name=thumbnail_name(object_name, size),
+        data=io.BytesIO(content),
+        length=len(content),
+        content_type="image/webp",
+    )
+    # ETag của object upload một lần (không multipart) chính là MD5 nội dung
+    return content, result.etag or hashlib.md5(content).hexdigest()
+
+
+def generate_thumbnails(object_name: str) -> None:
+    """
+    Tạo thumbnail WebP vuông cho mỗi kích thước trong AVATAR_THUMBNAIL_SIZES.
+    Chặn (tải ảnh, xử lý, upload), chạy trong background task hoặc thread.
+    """
+    image = _open_square(object_name)
+    # Thu nhỏ từ lớn đến bé, mỗi lần từ thumbnail trước
+    for size in sorted(settings.AVATAR_THUMBNAIL_SIZES, reverse=True):
+        image = _shrink(image, size)
+        _save_thumbnail(object_name, image, size)
+    logging.info(f"✅ Generated thumbnails for {object_name}")
+
+
+def generate_thumbnails_task(object_name: str) -> None:
+    """generate_thumbnails cho BackgroundTasks: lỗi chỉ ghi log, thumbnail sẽ được
+    tạo lại khi có request đầu tiên."""
+    try:
+        generate_thumbnails(object_name)
+    except Exception:
+        logging.exception(f"❌ Error generating thumbnails for {object_name}")
+
+
+def read_thumbnail(
+    object_name: str, size: int, etags: Collection[str] = ()
+) -> tuple[bytes | None, str]:
+    """
+    (nội dung, etag) thumbnail của avatar, chỉ tạo kích thước này nếu chưa có.
+    Nội dung là None nếu etag nằm trong `etags` (client đã có bản này).
+    S3Error nếu avatar không tồn tại, InvalidAvatar nếu quá lớn.
+    """
+    try:
+        response = get_minio_client().get_object(
+            bucket_name=MINIO_BUCKET, object_name=thumbnail_name(object_name, size)
+        )
+    except S3Error as e:
+        if e.code != "NoSuchKey":
+            raise
+        image = _shrink(_open_square(object_name), size)
+        return _save_thumbnail(object_name, image, size)
+    try:
+        etag = response.headers.get("ETag", "").strip('"')
+        # Không tải nội dung nếu client đã có
+        return (None if etag in etags else response.read()), etag
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def delete_avatar(object_name: str) -> None:
+    """Xóa avatar cùng các thumbnail."""
+    for name in [
+        object_name,
+        *(
+            thumbnail_name(object_name, size)
+            for size in settings.AVATAR_THUMBNAIL_SIZES
+        ),
+    ]:
+        get_minio_client().remove_object(bucket_name=MINIO_BUCKET, object_name=name)
+
+
+def delete_avatar_task(object_name: str) -> None:
+    """delete_avatar cho BackgroundTasks, lỗi chỉ ghi log."""
+    try:
+        delete_avatar(object_name)
+    except Exception:
+        logging.exception(f"❌ Error deleting avatar {object_name}")
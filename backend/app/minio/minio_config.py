@@ -1,8 +1,14 @@
+import asyncio
+from functools import cache
+
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 import os
 import logging
 
+from app.core.config import settings
+
 MINIO_HOST = os.getenv("MINIO_HOST", "localhost")
 MINIO_PORT = os.getenv("MINIO_PORT", "9000")
 MINIO_ROOT_USER = os.getenv("MINIO_ROOT_USER", "minioadmin")
@@ -10,21 +16,94 @@ MINIO_ROOT_PASSWORD = os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
 MINIO_BUCKET = os.getenv("MINIO_BUCKET", "my-bucket")
 MINIO_SECURE = os.getenv("MINIO_SECURE", False)
 
-minio_client = Minio(
-    endpoint=f"{MINIO_HOST}:{MINIO_PORT}",
-    access_key=MINIO_ROOT_USER,
-    secret_key=MINIO_ROOT_PASSWORD,
-    secure=MINIO_SECURE  # True nếu MinIO bật HTTPS
-)
+# Presigned URL được trình duyệt gọi trực tiếp nên phải ký theo địa chỉ public
+# của MinIO. Khai báo sẵn region để việc ký không cần gọi tới MinIO.
+# Biến rỗng (docker compose truyền ${VAR} chưa đặt) coi như chưa khai báo
+MINIO_PUBLIC_ENDPOINT = os.getenv("MINIO_PUBLIC_ENDPOINT") or f"{MINIO_HOST}:{MINIO_PORT}"
+MINIO_PUBLIC_SECURE = os.getenv("MINIO_PUBLIC_SECURE", "false").lower() == "true"
+MINIO_REGION = os.getenv("MINIO_REGION", "us-east-1")
+
+
+def _create_client(http_client: urllib3.PoolManager | None = None) -> Minio:
+    return Minio(
+        endpoint=f"{MINIO_HOST}:{MINIO_PORT}",
+        access_key=MINIO_ROOT_USER,
+        secret_key=MINIO_ROOT_PASSWORD,
+        secure=MINIO_SECURE,  # True nếu MinIO bật HTTPS
+        http_client=http_client,
+    )
+
+
+@cache
+def get_minio_client() -> Minio:
+    """Client dùng chung, chỉ tạo ở lần gọi đầu tiên."""
+    return _create_client()
+
+
+@cache
+def get_presign_client() -> Minio:
+    """Client chỉ để ký presigned URL theo địa chỉ public, không gọi tới MinIO."""
+    return Minio(
+        endpoint=MINIO_PUBLIC_ENDPOINT,
+        access_key=MINIO_ROOT_USER,
+        secret_key=MINIO_ROOT_PASSWORD,
+        secure=MINIO_PUBLIC_SECURE,
+        region=MINIO_REGION,
+    )
 
 
-def setup_minio_bucket():
+class StorageStatus:
+    """Trạng thái bucket sau khi kiểm tra lúc khởi động, health check đọc ở đây."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.error: str | None = None
+
+
+storage_status = StorageStatus()
+
+
+def setup_minio_bucket(client: Minio | None = None):
+    client = client or get_minio_client()
     try:
-        if not minio_client.bucket_exists(MINIO_BUCKET):
-            minio_client.make_bucket(MINIO_BUCKET)
+        if not client.bucket_exists(MINIO_BUCKET):
+            client.make_bucket(MINIO_BUCKET)
             logging.info(f"✅ Created bucket: {MINIO_BUCKET}")
         else:
             logging.info(f"✅ Bucket already exists: {MINIO_BUCKET}")
     except S3Error as e:
         logging.error(f"❌ MinIO setup error: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+async def ensure_minio_bucket() -> None:
+    """
+    Kiểm tra (tạo nếu chưa có) bucket, thử lại với backoff cho tới khi được.
+    Chạy nền trong lifespan: MinIO chưa sẵn sàng thì API vẫn khởi động được,
+    health check báo degraded.
+    """
+    timeout = settings.MINIO_SETUP_TIMEOUT_SECONDS
+    # Client mặc định không giới hạn thời gian chờ và tự retry, ở đây thì không
+    client = _create_client(
+        urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            retries=urllib3.Retry(total=0),
+        )
+    )
+    delay = 1.0
+    while True:
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(setup_minio_bucket, client), timeout=timeout * 2
+            )
+        except Exception as e:
+            storage_status.error = f"{type(e).__name__}: {e}"
+            logging.warning(
+                f"⚠️ MinIO unavailable, retrying in {delay:.0f}s: {storage_status.error}"
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.MINIO_SETUP_MAX_DELAY_SECONDS)
+        else:
+            storage_status.ready = True
+            storage_status.error = None
+            return
@@ -1,16 +1,50 @@
 # app/minio/minio_utils.py
+from minio.datatypes import Object
 from minio.error import S3Error
-from app.minio.minio_config import minio_client, MINIO_BUCKET
+from app.minio.minio_config import get_minio_client, get_presign_client, MINIO_BUCKET
 import logging
-from typing import Union
+from datetime import timedelta
+from typing import BinaryIO, Protocol, Union
 from pathlib import Path
 
+# Phần tối thiểu của multipart upload là 5 MiB
+PART_SIZE = 10 * 1024 * 1024
+
+
+class SizeLimitExceeded(Exception):
+    """The stream is larger than the allowed size."""
+
+
+class Readable(Protocol):
+    """File hoặc response HTTP (urllib3) đọc được theo từng phần."""
+
+    def read(self, size: int = ..., /) -> bytes: ...
+
+
+class LimitedReader:
+    """Đọc từ `stream`, raise SizeLimitExceeded khi vượt quá `limit` byte."""
+
+    def __init__(self, stream: Readable, limit: int):
+        self.stream = stream
+        self.limit = limit
+        self.read_bytes = 0
+
+    def read(self, size: int = -1) -> bytes:
+        # Đọc dư 1 byte để phát hiện file vượt giới hạn
+        if size < 0 or size > self.limit - self.read_bytes + 1:
+            size = self.limit - self.read_bytes + 1
+        chunk = self.stream.read(size)
+        self.read_bytes += len(chunk)
+        if self.read_bytes > self.limit:
+            raise SizeLimitExceeded()
+        return chunk
+
 
 def upload_file(file_path: Union[str, Path], object_name: str, content_type: str = "application/octet-stream"):
     """Upload a file to MinIO."""
     try:
         file_path = Path(file_path)
-        minio_client.fput_object(
+        get_minio_client().fput_object(
             bucket_name=MINIO_BUCKET,
             object_name=object_name,
             file_path=str(file_path),
@@ -22,11 +56,38 @@ def upload_file(file_path: Union[str, Path], object_name: str, content_type: str
         raise
 
 
+def upload_stream(
+    data: BinaryIO,
+    object_name: str,
+    length: int = -1,
+    content_type: str = "application/octet-stream",
+):
+    """
+    Upload a file-like object to MinIO without writing it to disk.
+
+    With `length=-1` (size unknown) it is sent as a multipart upload in parts of
+    PART_SIZE. Blocking, call it from a worker thread in async code.
+    """
+    try:
+        get_minio_client().put_object(
+            bucket_name=MINIO_BUCKET,
+            object_name=object_name,
+            data=data,
+            length=length,
+            content_type=content_type,
+            part_size=PART_SIZE,
+        )
+        logging.info(f"✅ Uploaded stream to MinIO: {object_name}")
+    except S3Error as e:
+        logging.error(f"❌ Error uploading stream: {e}")
+        raise
+
+
 def download_file(object_name: str, file_path: Union[str, Path]):
     """Download a file from MinIO."""
     try:
         file_path = Path(file_path)
-        minio_client.fget_object(
+        get_minio_client().fget_object(
             bucket_name=MINIO_BUCKET,
             object_name=object_name,
             file_path=str(file_path)
@@ -40,7 +101,7 @@ def download_file(object_name: str, file_path: Union[str, Path]):
 def delete_file(object_name: str):
     """Delete a file from MinIO."""
     try:
-        minio_client.remove_object(
+        get_minio_client().remove_object(
             bucket_name=MINIO_BUCKET,
             object_name=object_name
         )
@@ -48,3 +109,24 @@ def delete_file(object_name: str):
     except S3Error as e:
         logging.error(f"❌ Error deleting file: {e}")
         raise
+
+
+def stat_file(object_name: str) -> Object:
+    """Metadata (size, content type...) of an object, S3Error if it doesn't exist."""
+    return get_minio_client().stat_object(
+        bucket_name=MINIO_BUCKET, object_name=object_name
+    )
+
+
+def presigned_upload_url(object_name: str, expires: timedelta) -> str:
+    """URL the client can PUT the object to directly, valid for `expires`."""
+    return get_presign_client().presigned_put_object(
+        bucket_name=MINIO_BUCKET, object_name=object_name, expires=expires
+    )
+
+
+def presigned_download_url(object_name: str, expires: timedelta) -> str:
+    """URL the client can GET the object from directly, valid for `expires`."""
+    return get_presign_client().presigned_get_object(
+        bucket_name=MINIO_BUCKET, object_name=object_name, expires=expires
+    )
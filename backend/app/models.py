@@ -1,11 +1,11 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import EmailStr
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import UniqueConstraint, Column, ForeignKey
+from sqlalchemy import UniqueConstraint, Column, ForeignKey, Index, text
 
 
 # Shared properties
@@ -28,6 +28,19 @@ class UserRegister(SQLModel):
 
 
 # Properties to receive via API on update, all are optional
+class UserImportResult(SQLModel):
+    row: int  # số thứ tự dòng dữ liệu, bắt đầu từ 1 (không tính header CSV)
+    email: str | None = None
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    error: str | None = None
+
+
+class UserImportReport(SQLModel):
+    created: int
+    failed: int
+    results: list[UserImportResult]
+
+
 class UserUpdate(UserBase):
     email: EmailStr | None = Field(default=None, max_length=255)  # type: ignore
     password: str | None = Field(default=None, min_length=8, max_length=40)
@@ -51,6 +64,21 @@ class UserUpdateThemes(SQLModel):
     lang: Optional[Lang] = Field(default=None)
 
 
+class AvatarUploadUrl(SQLModel):
+    object_name: str
+    url: str  # PUT file lên URL này rồi gọi /users/me/avatar/complete
+    expires_in: int  # giây
+
+
+class AvatarUploadComplete(SQLModel):
+    object_name: str = Field(max_length=255)
+
+
+class AvatarUrl(SQLModel):
+    url: str
+    expires_in: int  # giây
+
+
 class UpdatePassword(SQLModel):
     current_password: str = Field(min_length=8, max_length=40)
     new_password: str = Field(min_length=8, max_length=40)
@@ -60,6 +88,7 @@ class UpdatePassword(SQLModel):
 class User(UserBase,UserUpdateThemes, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
+    avatar: str | None = Field(default=None, max_length=255)  # object name trên MinIO
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
     units: list["UnitUser"] = Relationship(
         back_populates="user",
@@ -92,11 +121,14 @@ class User(UserBase,UserUpdateThemes, table=True):
 # Properties to return via API, id is always required
 class UserPublic(UserBase, UserUpdateThemes):
     id: uuid.UUID
+    avatar: str | None = None
 
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
+    # Only set in cursor pagination mode, None on the last page
+    next_cursor: str | None = None
 
 
 # Shared properties
@@ -120,7 +152,7 @@ class Item(ItemBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(
-        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
     )
     owner: User | None = Relationship(back_populates="items")
 
@@ -134,6 +166,8 @@ class ItemPublic(ItemBase):
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
     count: int
+    # Only set in cursor pagination mode, None on the last page
+    next_cursor: str | None = None
 
 
 # Generic message
@@ -141,6 +175,12 @@ class Message(SQLModel):
     message: str
 
 
+class HealthCheck(SQLModel):
+    # "degraded": the API is up but a dependency (object storage) is not
+    status: Literal["ok", "degraded"]
+    storage: Literal["ok", "unavailable"]
+
+
 # JSON payload containing access token
 class Token(SQLModel):
     access_token: str
@@ -160,11 +200,13 @@ class NewPassword(SQLModel):
 #### Xử lý models cho chức năng quản lý đơn vị
 class Unit(SQLModel, table=True):
     __tablename__ = "unit"
+    # Khóa phân trang theo cursor của filter_units_page
+    __table_args__ = (Index("ix_unit_created_at_id", "created_at", "id"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str = Field(min_length=3, max_length=255, unique=True)
     description: Optional[str] = Field(default=None, max_length=255)
-    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
-    created_by: uuid.UUID = Field(foreign_key="user.id", nullable=False) # Added foreign key for creator
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_by: uuid.UUID = Field(foreign_key="user.id", nullable=False, index=True) # Added foreign key for creator
 
     members: list["UnitUser"] = Relationship(back_populates="unit")
     creator: Optional["User"] = Relationship(
@@ -179,14 +221,24 @@ class Unit(SQLModel, table=True):
 
 class UnitUser(SQLModel, table=True):
     __tablename__ = "unit_user"
-    __table_args__ = (UniqueConstraint("unit_id", "user_id", name="uq_unit_user"),)
+    __table_args__ = (
+        UniqueConstraint("unit_id", "user_id", name="uq_unit_user"),
+        # Mỗi unit chỉ có vài leader: index nhỏ cho phép join tìm leader, kèm user_id
+        # để lọc theo leader không cần đọc lại bảng
+        Index(
+            "ix_unit_user_leader",
+            "unit_id",
+            postgresql_where=text("is_leader"),
+            postgresql_include=["user_id"],
+        ),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     unit_id: uuid.UUID = Field(foreign_key="unit.id", nullable=False)
-    user_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
+    user_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, index=True)
     is_leader: bool = Field(default=False)
     updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
-    updated_by: uuid.UUID = Field(foreign_key="user.id", nullable=False)
+    updated_by: uuid.UUID = Field(foreign_key="user.id", nullable=False, index=True)
 
     unit: Optional["Unit"] = Relationship(back_populates="members")
     user: Optional["User"] = Relationship(
@@ -210,13 +262,19 @@ class UnitCreate(SQLModel):
     leader_id: uuid.UUID
     member_ids: list[uuid.UUID] = []
 
+class UnitBulkCreate(SQLModel):
+    units: list[UnitCreate] = Field(min_length=1, max_length=1000)
+
+class UnitsCreated(SQLModel):
+    ids: list[uuid.UUID]  # cùng thứ tự với units trong request
+
 class UnitRead(SQLModel):
     id: uuid.UUID
     name: str
     description: Optional[str]
     created_at: datetime
 
-    leader: Optional[User] = None  # leader là 1 user
+    leader: Optional[UserBase] = None  # leader là 1 user
     member_count: int = 0              # tổng số thành viên
 
 class UnitUpdate(SQLModel):
@@ -225,6 +283,10 @@ class UnitUpdate(SQLModel):
     user_ids: Optional[list[uuid.UUID]] = None  # danh sách thành viên (cập nhật lại toàn bộ)
     leader_id: Optional[uuid.UUID] = None  # user_id của leader
 
+class UnitMembersUpdate(SQLModel):
+    add_user_ids: list[uuid.UUID] = []
+    remove_user_ids: list[uuid.UUID] = []  # xóa trước khi thêm
+
 class UnitUserCreate(SQLModel):
     unit_id: uuid.UUID
     user_id: uuid.UUID
@@ -236,6 +298,11 @@ class UnitFilterRequest(SQLModel):
     leader_id: Optional[list[uuid.UUID]] = None
     page: Optional[int] = 1
     page_size: Optional[int] = 20
+    cursor: Optional[str] = None  # chỉ dùng cho /units/filter-page, thay cho page
+
+class UnitsPublic(SQLModel):
+    data: list[UnitRead]
+    next_cursor: Optional[str] = None  # None khi là trang cuối
 
 # Bảng lưu audit log
 
@@ -245,11 +312,15 @@ class LogResult(str, Enum):
 
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_log"
+    # Chia partition theo tháng của created_at (xem app/core/audit.py), khóa chính
+    # của bảng partition phải chứa cột partition
     __table_args__ = (
-
+        Index("ix_audit_log_created_at", "created_at", "id"),
+        Index("ix_audit_log_created_by", "created_by", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, primary_key=True)
     created_by: uuid.UUID = Field(foreign_key="user.id", nullable=False)
     content: str
     status: Optional[LogResult] = Field(default=None)
@@ -261,4 +332,21 @@ class AuditLogCreate(SQLModel):
     status: Optional[LogResult]
     created_by: uuid.UUID
 
+class AuditLogPublic(SQLModel):
+    id: uuid.UUID
+    created_at: datetime
+    created_by: uuid.UUID
+    content: str
+    status: Optional[LogResult]
+
+class AuditLogFilter(SQLModel):
+    created_by: Optional[list[uuid.UUID]] = None
+    status: Optional[LogResult] = None
+    created_from: Optional[datetime] = None  # bao gồm mốc này
+    created_to: Optional[datetime] = None  # không bao gồm mốc này
+
+class AuditLogsPublic(SQLModel):
+    data: list[AuditLogPublic]
+    next_cursor: Optional[str] = None  # None khi là trang cuối
+
 
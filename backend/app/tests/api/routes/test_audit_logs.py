@@ -0,0 +1,127 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models import LogResult
+from app.tests.utils.audit_log import create_random_audit_logs
+
+
+def test_read_audit_logs_pages(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, logs = create_random_audit_logs(db, 3)
+    url = f"{settings.API_V1_STR}/audit-logs/"
+    params = {"created_by": str(user_id), "limit": 2}
+
+    r = client.get(url, headers=superuser_token_headers, params=params)
+    assert r.status_code == 200
+    first_page = r.json()
+    assert [log["id"] for log in first_page["data"]] == [
+        str(logs[2].id),
+        str(logs[1].id),
+    ]
+    assert first_page["next_cursor"]
+
+    r = client.get(
+        url,
+        headers=superuser_token_headers,
+        params={**params, "cursor": first_page["next_cursor"]},
+    )
+    second_page = r.json()
+    assert [log["id"] for log in second_page["data"]] == [str(logs[0].id)]
+    assert second_page["next_cursor"] is None
+
+
+def test_read_audit_logs_filters(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, logs = create_random_audit_logs(db, 3, status=LogResult.failed)
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/",
+        headers=superuser_token_headers,
+        params={
+            "created_by": str(user_id),
+            "status": "failed",
+            "created_from": logs[1].created_at.isoformat(),
+            "created_to": (logs[2].created_at + timedelta(seconds=1)).isoformat(),
+        },
+    )
+    assert r.status_code == 200
+    assert [log["id"] for log in r.json()["data"]] == [
+        str(logs[2].id),
+        str(logs[1].id),
+    ]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/",
+        headers=superuser_token_headers,
+        params={"created_by": str(user_id), "status": "success"},
+    )
+    assert r.json()["data"] == []
+
+
+def test_read_audit_logs_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert r.status_code == 400
+
+
+def test_read_audit_logs_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_export_audit_logs_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, logs = create_random_audit_logs(db, 3)
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/export",
+        headers=superuser_token_headers,
+        params={"created_by": str(user_id)},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["id"] for row in rows] == [str(log.id) for log in logs]
+    assert rows[0]["content"] == logs[0].content
+    assert rows[0]["status"] == "success"
+
+
+def test_export_audit_logs_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, logs = create_random_audit_logs(db, 2)
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/export",
+        headers=superuser_token_headers,
+        params={"created_by": str(user_id), "format": "csv"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0] == ["id", "created_at", "created_by", "content", "status"]
+    assert [row[0] for row in rows[1:]] == [str(log.id) for log in logs]
+
+
+def test_export_audit_logs_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/audit-logs/export", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -1,9 +1,13 @@
 import uuid
 
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, col, func, select
 
+from app import crud
 from app.core.config import settings
+from app.core.pagination import count_cache
+from app.models import Item
 from app.tests.utils.item import create_random_item
 
 
@@ -79,6 +83,123 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_cursor_pagination(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        create_random_item(db)
+    seen: list[str] = []
+    params: dict[str, str | int] = {"pagination": "cursor", "limit": 2}
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params=params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        assert len(content["data"]) <= 2
+        seen.extend(item["id"] for item in content["data"])
+        if content["next_cursor"] is None:
+            break
+        params["cursor"] = content["next_cursor"]
+    assert len(seen) == len(set(seen)) == content["count"]
+    assert seen == sorted(seen)
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("count_mode", ["exact", "window", "cached"])
+def test_read_items_count_mode(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    count_mode: str,
+) -> None:
+    create_random_item(db)
+    count_cache.clear()
+    total = db.exec(select(func.count()).select_from(Item)).one()
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"count_mode": count_mode, "limit": 1},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == total
+
+
+def test_read_items_window_count_after_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(3):
+        create_random_item(db)
+    total = db.exec(select(func.count()).select_from(Item)).one()
+    params: dict[str, str | int] = {
+        "pagination": "cursor",
+        "limit": 1,
+        "count_mode": "window",
+    }
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", headers=superuser_token_headers, params=params
+    )
+    assert response.json()["count"] == total
+
+    # Trang sau vẫn trả tổng số, không phải số dòng còn lại sau cursor
+    params["cursor"] = response.json()["next_cursor"]
+    response = client.get(
+        f"{settings.API_V1_STR}/items/", headers=superuser_token_headers, params=params
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == total
+
+
+def test_read_items_cached_count(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    count_cache.clear()
+    url = f"{settings.API_V1_STR}/items/"
+    params: dict[str, str | int] = {"count_mode": "cached", "limit": 1}
+    cached = client.get(url, headers=superuser_token_headers, params=params)
+    create_random_item(db)
+
+    response = client.get(url, headers=superuser_token_headers, params=params)
+    assert response.json()["count"] == cached.json()["count"]
+    response = client.get(url, headers=superuser_token_headers, params={"limit": 1})
+    assert response.json()["count"] == cached.json()["count"] + 1
+
+
+def test_read_items_estimated_count(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    params: dict[str, str | int] = {"count_mode": "estimate", "limit": 1}
+    response = client.get(url, headers=superuser_token_headers, params=params)
+    assert response.status_code == 200
+    assert response.json()["count"] >= 0
+
+    # Danh sách đã lọc theo owner không ước lượng được, đếm chính xác
+    user = crud.get_user_by_email(session=db, email=settings.EMAIL_TEST_USER)
+    assert user
+    owned = db.exec(
+        select(func.count()).select_from(Item).where(col(Item.owner_id) == user.id)
+    ).one()
+    response = client.get(url, headers=normal_user_token_headers, params=params)
+    assert response.json()["count"] == owned
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -0,0 +1,342 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select, update
+
+from app.core.config import settings
+from app.models import Unit, UnitUser
+from app.tests.utils.unit import create_random_unit, member_row_ids, unit_members
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def test_create_unit(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    member = create_random_user(db)
+    name = random_lower_string()
+    data = {
+        "name": name,
+        "leader_id": str(leader.id),
+        "member_ids": [str(member.id), str(leader.id)],
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/units/", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 200
+    unit = db.exec(select(Unit).where(Unit.name == name)).one()
+    assert unit_members(db, unit.id) == {leader.id: True, member.id: False}
+
+
+def test_create_unit_message_in_request_language(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    data = {"name": random_lower_string(), "leader_id": str(leader.id)}
+    r = client.post(
+        f"{settings.API_V1_STR}/units/",
+        headers={**superuser_token_headers, "Accept-Language": "en-US,en;q=0.9"},
+        json=data,
+    )
+    assert r.status_code == 200
+    assert r.json()["message"] == "Unit created successfully"
+
+
+def test_create_unit_missing_member(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    name = random_lower_string()
+    data = {
+        "name": name,
+        "leader_id": str(leader.id),
+        "member_ids": [str(uuid.uuid4())],
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/units/", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
+    assert db.exec(select(Unit).where(Unit.name == name)).first() is None
+
+
+def test_create_unit_name_too_short(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    name = random_lower_string()[:2]
+    data = {"name": name, "leader_id": str(leader.id)}
+    r = client.post(
+        f"{settings.API_V1_STR}/units/", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
+    assert db.exec(select(Unit).where(Unit.name == name)).first() is None
+
+
+def test_create_units_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    members = [create_random_user(db) for _ in range(3)]
+    data = {
+        "units": [
+            {
+                "name": random_lower_string(),
+                "leader_id": str(leader.id),
+                "member_ids": [str(member.id) for member in members],
+            },
+            {"name": random_lower_string(), "leader_id": str(members[0].id)},
+        ]
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/units/bulk", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 200
+    first_id, second_id = (uuid.UUID(id) for id in r.json()["ids"])
+    assert unit_members(db, first_id) == {
+        leader.id: True,
+        **{member.id: False for member in members},
+    }
+    assert unit_members(db, second_id) == {members[0].id: True}
+
+
+def test_create_units_bulk_is_atomic(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    names = [random_lower_string(), random_lower_string()]
+    data = {
+        "units": [
+            {"name": names[0], "leader_id": str(leader.id)},
+            {"name": names[1], "leader_id": str(uuid.uuid4())},
+        ]
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/units/bulk", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
+    assert db.exec(select(Unit).where(col(Unit.name).in_(names))).all() == []
+
+
+def test_create_units_bulk_name_too_short(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    names = [random_lower_string(), random_lower_string()[:2]]
+    data = {"units": [{"name": name, "leader_id": str(leader.id)} for name in names]}
+    r = client.post(
+        f"{settings.API_V1_STR}/units/bulk", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
+    assert db.exec(select(Unit).where(col(Unit.name).in_(names))).all() == []
+
+
+def test_create_units_bulk_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    leader = create_random_user(db)
+    data = {"units": [{"name": random_lower_string(), "leader_id": str(leader.id)}]}
+    r = client.post(
+        f"{settings.API_V1_STR}/units/bulk",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+    assert r.status_code == 403
+
+
+def test_update_unit_members_keeps_unchanged_rows(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader, kept, removed, added = (create_random_user(db) for _ in range(4))
+    unit_id = create_random_unit(db, leader.id, [kept.id, removed.id])
+    row_ids = member_row_ids(db, unit_id)
+
+    r = client.put(
+        f"{settings.API_V1_STR}/units/update",
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={
+            "user_ids": [str(leader.id), str(kept.id), str(added.id)],
+            "leader_id": str(kept.id),
+        },
+    )
+    assert r.status_code == 200
+    db.expire_all()
+    assert unit_members(db, unit_id) == {
+        leader.id: False,
+        kept.id: True,
+        added.id: False,
+    }
+    new_row_ids = member_row_ids(db, unit_id)
+    assert new_row_ids[leader.id] == row_ids[leader.id]
+    assert new_row_ids[kept.id] == row_ids[kept.id]
+
+
+def test_update_unit_leader_only(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader, member, outsider = (create_random_user(db) for _ in range(3))
+    unit_id = create_random_unit(db, leader.id, [member.id])
+    url = f"{settings.API_V1_STR}/units/update"
+
+    r = client.put(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={"leader_id": str(outsider.id)},
+    )
+    assert r.status_code == 400
+
+    r = client.put(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={"leader_id": str(member.id)},
+    )
+    assert r.status_code == 200
+    db.expire_all()
+    assert unit_members(db, unit_id) == {leader.id: False, member.id: True}
+
+
+def test_patch_unit_members(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    leader, member, added = (create_random_user(db) for _ in range(3))
+    unit_id = create_random_unit(db, leader.id, [member.id])
+    url = f"{settings.API_V1_STR}/units/members"
+
+    r = client.patch(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={
+            "add_user_ids": [str(added.id), str(leader.id)],
+            "remove_user_ids": [str(member.id)],
+        },
+    )
+    assert r.status_code == 200
+    db.expire_all()
+    assert unit_members(db, unit_id) == {leader.id: True, added.id: False}
+
+    r = client.patch(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={"remove_user_ids": [str(leader.id)]},
+    )
+    assert r.status_code == 400
+
+    r = client.patch(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(unit_id)},
+        json={"add_user_ids": [str(uuid.uuid4())]},
+    )
+    assert r.status_code == 400
+
+    r = client.patch(
+        url,
+        headers=superuser_token_headers,
+        params={"unit_id": str(uuid.uuid4())},
+        json={"add_user_ids": [str(added.id)]},
+    )
+    assert r.status_code == 404
+
+
+def test_filter_units_page_same_created_at(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    # Các unit tạo chung một request có cùng created_at, thứ tự chỉ còn dựa vào id
+    leader = create_random_user(db)
+    prefix = random_lower_string()
+    data = {
+        "units": [
+            {"name": f"{prefix}{i}", "leader_id": str(leader.id)} for i in range(7)
+        ]
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/units/bulk", headers=superuser_token_headers, json=data
+    )
+    created = set(r.json()["ids"])
+    units = db.exec(select(Unit).where(col(Unit.id).in_(created))).all()
+    assert len({unit.created_at for unit in units}) == 1
+
+    seen: list[str] = []
+    cursor = None
+    for _ in range(10):
+        r = client.post(
+            f"{settings.API_V1_STR}/units/filter-page",
+            headers=superuser_token_headers,
+            json={"name": prefix, "page_size": 3, "cursor": cursor},
+        )
+        assert r.status_code == 200
+        page = r.json()
+        assert len(page["data"]) <= 3
+        seen += [unit["id"] for unit in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert set(seen) == created
+
+
+def test_filter_units_page_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/units/filter-page",
+        headers=superuser_token_headers,
+        json={"cursor": "not-a-cursor"},
+    )
+    assert r.status_code == 400
+
+
+def test_filter_units(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    leader, other_leader, member = (create_random_user(db) for _ in range(3))
+    unit_id = create_random_unit(db, leader.id, [member.id])
+    other_id = create_random_unit(db, other_leader.id, [])
+    url = f"{settings.API_V1_STR}/units/filter"
+
+    r = client.post(
+        url, headers=normal_user_token_headers, json={"leader_id": [str(leader.id)]}
+    )
+    assert r.status_code == 200
+    (unit,) = r.json()
+    assert unit["id"] == str(unit_id)
+    assert unit["leader"]["email"] == leader.email
+    assert unit["member_count"] == 2
+
+    r = client.post(
+        url,
+        headers=normal_user_token_headers,
+        json={"created_by": [str(other_leader.id)]},
+    )
+    assert [unit["id"] for unit in r.json()] == [str(other_id)]
+
+
+def test_filter_units_with_two_leaders(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    # Không có ràng buộc nào chặn hai dòng is_leader, unit vẫn chỉ trả về một lần
+    leader, member = create_random_user(db), create_random_user(db)
+    unit_id = create_random_unit(db, leader.id, [member.id])
+    db.execute(
+        update(UnitUser).where(col(UnitUser.unit_id) == unit_id).values(is_leader=True)
+    )
+    db.commit()
+    unit = db.get(Unit, unit_id)
+    assert unit
+
+    for path in ("filter", "filter-page"):
+        r = client.post(
+            f"{settings.API_V1_STR}/units/{path}",
+            headers=normal_user_token_headers,
+            json={"name": unit.name},
+        )
+        assert r.status_code == 200
+        units = r.json() if path == "filter" else r.json()["data"]
+        assert [unit["id"] for unit in units] == [str(unit_id)]
+        assert units[0]["leader"]["email"] in (leader.email, member.email)
+        assert units[0]["member_count"] == 2
@@ -1,13 +1,25 @@
+import io
+import json
 import uuid
+from collections.abc import Iterator
 from unittest.mock import patch
 
+import httpx
+import pytest
 from fastapi.testclient import TestClient
+from minio.error import S3Error
+from PIL import Image
 from sqlmodel import Session, select
 
 from app import crud
+from app.api.routes.users import _read_csv, _read_ndjson
 from app.core.config import settings
 from app.core.security import verify_password
+from app.minio.avatars import thumbnail_name
+from app.minio.minio_config import get_minio_client
+from app.minio.minio_utils import stat_file
 from app.models import User, UserCreate
+from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -168,6 +180,34 @@ def test_retrieve_users(
         assert "email" in item
 
 
+@pytest.mark.parametrize("count_mode", ["window", "cached"])
+def test_retrieve_users_count_mode(
+    client: TestClient, superuser_token_headers: dict[str, str], count_mode: str
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+    exact_count = r.json()["count"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"count_mode": count_mode},
+    )
+    assert r.status_code == 200
+    assert r.json()["count"] == exact_count
+
+
+def test_retrieve_users_estimated_count(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"count_mode": "estimate"},
+    )
+    assert r.status_code == 200
+    assert r.json()["count"] >= 0
+
+
 def test_update_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -346,6 +386,32 @@ def test_update_user(
     assert user_db.full_name == "Updated_full_name"
 
 
+def test_update_user_deactivated_takes_effect(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    # Warm the cached user snapshot
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Inactive user"
+
+
 def test_update_user_not_exists(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -484,3 +550,341 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_import_users_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    new_email = random_email()
+    password = random_lower_string()
+    content = "\n".join(
+        [
+            "email,password,full_name",
+            f"{new_email},{password},Nguyễn Văn A",
+            f"{new_email},{random_lower_string()},",
+            f"{settings.FIRST_SUPERUSER},{random_lower_string()},",
+            f"{random_email()},short,",
+        ]
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/users/import",
+        headers=superuser_token_headers,
+        files={"file": ("users.csv", content.encode(), "text/csv")},
+    )
+    assert r.status_code == 200
+    report = r.json()
+    assert report["created"] == 1
+    assert report["failed"] == 3
+    assert [result["status"] for result in report["results"]] == [
+        "created",
+        "duplicate",
+        "exists",
+        "invalid",
+    ]
+    assert "password" in report["results"][3]["error"]
+
+    user = crud.get_user_by_email(session=db, email=new_email)
+    assert user
+    assert user.full_name == "Nguyễn Văn A"
+    assert verify_password(password, user.hashed_password)
+
+
+def test_import_users_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    new_email = random_email()
+    content = "\n".join(
+        [
+            json.dumps({"email": new_email, "password": random_lower_string()}),
+            "",
+            "{not json",
+            "[1, 2]",
+        ]
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/users/import",
+        headers=superuser_token_headers,
+        files={"file": ("users.ndjson", content.encode(), "application/x-ndjson")},
+    )
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [(result["row"], result["status"]) for result in results] == [
+        (1, "created"),
+        (2, "invalid"),
+        (3, "invalid"),
+    ]
+    assert crud.get_user_by_email(session=db, email=new_email)
+
+
+def test_import_users_csv_bom_and_quoted_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    # File xuất từ Excel: có BOM, xuống dòng CRLF, ô chứa dấu phẩy và xuống dòng
+    new_email = random_email()
+    content = (
+        "email,password,full_name\r\n"
+        f'{new_email},{random_lower_string()},"Trần, Thị\r\nB"\r\n'
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/users/import",
+        headers=superuser_token_headers,
+        files={"file": ("users.csv", content.encode("utf-8-sig"), "text/csv")},
+    )
+    assert r.status_code == 200
+    assert r.json()["created"] == 1
+    user = crud.get_user_by_email(session=db, email=new_email)
+    assert user
+    assert user.full_name == "Trần, Thị\r\nB"
+
+
+def test_read_import_file_without_readable() -> None:
+    # SpooledTemporaryFile của Python 3.10 không có readable()/seekable()
+    class BytesLines:
+        def __init__(self, data: bytes) -> None:
+            self._lines = io.BytesIO(data).readlines()
+
+        def __iter__(self) -> Iterator[bytes]:
+            return iter(self._lines)
+
+    csv_file = BytesLines("\ufeffemail,password\na@example.com,x\n".encode())
+    assert list(_read_csv(csv_file)) == [  # type: ignore[arg-type]
+        {"email": "a@example.com", "password": "x"}
+    ]
+    ndjson_file = BytesLines(b'{"email": "b@example.com"}\n\n[]\n')
+    assert list(_read_ndjson(ndjson_file)) == [  # type: ignore[arg-type]
+        {"email": "b@example.com"},
+        "Expected a JSON object",
+    ]
+
+
+def test_import_users_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/import",
+        headers=normal_user_token_headers,
+        files={"file": ("users.csv", b"email,password\n", "text/csv")},
+    )
+    assert r.status_code == 403
+
+
+def png_bytes(width: int = 300, height: int = 200) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def presign_for_backend() -> Iterator[None]:
+    # Presigned URL ký theo MINIO_PUBLIC_ENDPOINT dành cho trình duyệt, test chạy
+    # trong container backend nên ký theo MINIO_HOST:MINIO_PORT như client chính
+    with patch("app.minio.minio_utils.get_presign_client", get_minio_client):
+        yield
+
+
+def test_upload_avatar(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/upload-avatar",
+        headers=normal_user_token_headers,
+        files={"file": ("avatar.png", png_bytes(), "image/png")},
+    )
+    assert r.status_code == 200
+    object_name = r.json()["object_name"]
+    assert object_name.startswith("avatars/") and object_name.endswith(".png")
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert r.json()["avatar"] == object_name
+
+
+def test_upload_avatar_not_an_image(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/upload-avatar",
+        headers=normal_user_token_headers,
+        files={"file": ("avatar.txt", b"hello", "text/plain")},
+    )
+    assert r.status_code == 415
+
+
+def test_read_avatar_thumbnail(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/upload-avatar",
+        headers=normal_user_token_headers,
+        files={"file": ("avatar.png", png_bytes(), "image/png")},
+    )
+    url = f"{settings.API_V1_STR}/users/{r.json()['object_name']}"
+
+    r = client.get(url, params={"size": 64})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/webp"
+    assert "immutable" in r.headers["cache-control"]
+    assert Image.open(io.BytesIO(r.content)).size == (64, 64)
+
+    etag = r.headers["etag"]
+    r = client.get(url, params={"size": 64}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    assert not r.content
+
+    r = client.get(
+        url, params={"size": 64}, headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert r.status_code == 304
+
+    # Một phần của ETag không phải là ETag đó
+    r = client.get(url, params={"size": 64}, headers={"If-None-Match": etag[:-3]})
+    assert r.status_code == 200
+
+
+def test_read_avatar_thumbnail_generates_requested_size(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch("app.api.routes.users.generate_thumbnails_task"):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/me/upload-avatar",
+            headers=normal_user_token_headers,
+            files={"file": ("avatar.png", png_bytes(), "image/png")},
+        )
+    object_name = r.json()["object_name"]
+
+    r = client.get(f"{settings.API_V1_STR}/users/{object_name}", params={"size": 64})
+    assert r.status_code == 200
+    assert Image.open(io.BytesIO(r.content)).size == (64, 64)
+    stat_file(thumbnail_name(object_name, 64))
+    with pytest.raises(S3Error):
+        stat_file(thumbnail_name(object_name, 128))
+
+
+def test_read_avatar_thumbnail_too_large(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch("app.api.routes.users.generate_thumbnails_task"):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/me/upload-avatar",
+            headers=normal_user_token_headers,
+            files={"file": ("avatar.png", png_bytes(), "image/png")},
+        )
+    url = f"{settings.API_V1_STR}/users/{r.json()['object_name']}"
+
+    with patch("app.core.config.settings.AVATAR_MAX_PIXELS", 100 * 100):
+        r = client.get(url, params={"size": 64})
+    assert r.status_code == 404
+    with patch("app.core.config.settings.AVATAR_MAX_SIZE_BYTES", 100):
+        r = client.get(url, params={"size": 64})
+    assert r.status_code == 404
+
+
+@pytest.mark.usefixtures("presign_for_backend")
+def test_read_avatar_thumbnail_not_current_avatar(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # Upload bằng presigned URL nhưng chưa complete
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/avatar/upload-url",
+        headers=normal_user_token_headers,
+        params={"filename": "avatar.png"},
+    )
+    upload = r.json()
+    r = httpx.put(
+        upload["url"], content=png_bytes(), headers={"Content-Type": "image/png"}
+    )
+    assert r.status_code == 200
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{upload['object_name']}", params={"size": 64}
+    )
+    assert r.status_code == 404
+    with pytest.raises(S3Error):
+        stat_file(thumbnail_name(upload["object_name"], 64))
+
+
+def test_read_avatar_thumbnail_invalid_size(client: TestClient) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/avatars/{uuid.uuid4()}/avatar.png",
+        params={"size": 100},
+    )
+    assert r.status_code == 400
+
+
+def test_read_avatar_thumbnail_not_found(client: TestClient) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/avatars/{uuid.uuid4()}/avatar.png",
+        params={"size": 64},
+    )
+    assert r.status_code == 404
+
+
+def test_upload_avatar_too_large(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch("app.core.config.settings.AVATAR_MAX_SIZE_BYTES", 1024):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/me/upload-avatar",
+            headers=normal_user_token_headers,
+            files={"file": ("avatar.png", b"0" * 1025, "image/png")},
+        )
+    assert r.status_code == 413
+
+
+@pytest.mark.usefixtures("presign_for_backend")
+def test_presigned_avatar_upload(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/avatar/upload-url",
+        headers=normal_user_token_headers,
+        params={"filename": "me.PNG"},
+    )
+    assert r.status_code == 200
+    upload = r.json()
+    assert upload["object_name"].endswith(".png")
+
+    content = png_bytes()
+    r = httpx.put(upload["url"], content=content, headers={"Content-Type": "image/png"})
+    assert r.status_code == 200
+
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/avatar/complete",
+        headers=normal_user_token_headers,
+        json={"object_name": upload["object_name"]},
+    )
+    assert r.status_code == 200
+    user = r.json()
+    assert user["avatar"] == upload["object_name"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{user['id']}/avatar-url",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 200
+    assert httpx.get(r.json()["url"]).content == content
+
+
+def test_complete_avatar_upload_rejects_other_objects(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/me/avatar/complete",
+        headers=normal_user_token_headers,
+        json={"object_name": f"avatars/{uuid.uuid4()}/avatar.png"},
+    )
+    assert r.status_code == 400
+
+
+def test_read_avatar_url_without_avatar(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = crud.create_user(
+        session=db,
+        user_create=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{user.id}/avatar-url",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_health_check(client: TestClient) -> None:
+    with patch("app.minio.minio_config.storage_status.ready", True):
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok", "storage": "ok"}
+
+
+def test_health_check_degraded(client: TestClient) -> None:
+    with patch("app.minio.minio_config.storage_status.ready", False):
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert r.status_code == 200
+    assert r.json() == {"status": "degraded", "storage": "unavailable"}
+
+
+def test_read_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    pools = r.json()["db_pool"]
+    for name in ("sync", "async"):
+        assert pools[name]["size"] == settings.POSTGRES_POOL_SIZE
+        assert "checked_out" in pools[name]
+        assert "+Inf" in pools[name]["wait_time_seconds"]["buckets"]
+
+
+def test_read_metrics_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -1,13 +1,17 @@
+import time
 from collections.abc import Generator
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
 
+from app.core.audit import audit_log_writer
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.minio.minio_config import storage_status
+from app.models import AuditLog, Item, Unit, UnitUser, User
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 
@@ -17,6 +21,12 @@ def db() -> Generator[Session, None, None]:
     with Session(engine) as session:
         init_db(session)
         yield session
+        statement = delete(AuditLog)
+        session.execute(statement)
+        statement = delete(UnitUser)
+        session.execute(statement)
+        statement = delete(Unit)
+        session.execute(statement)
         statement = delete(Item)
         session.execute(statement)
         statement = delete(User)
@@ -24,9 +34,24 @@ def db() -> Generator[Session, None, None]:
         session.commit()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def audit_log_sync() -> Generator[None, None, None]:
+    # Requests insert their audit entries themselves, tests can read them at once
+    with (
+        patch.object(settings, "AUDIT_LOG_SYNC", True),
+        patch.object(audit_log_writer, "synchronous", True),
+    ):
+        yield
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
+        # The lifespan checks the MinIO bucket in the background, wait for it so
+        # the first avatar test does not race it
+        deadline = time.monotonic() + 30
+        while not storage_status.ready and time.monotonic() < deadline:
+            time.sleep(0.1)
         yield c
 
 
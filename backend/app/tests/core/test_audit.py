@@ -0,0 +1,125 @@
+import time
+from datetime import date, datetime
+from unittest.mock import patch
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, func, select
+
+from app.core.audit import (
+    AuditLogWriter,
+    create_partitions,
+    drop_expired_partitions,
+    partition_name,
+)
+from app.models import AuditLog, AuditLogCreate, LogResult
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def count_logs(db: Session, content: str) -> int:
+    statement = select(func.count()).where(AuditLog.content == content)
+    return db.exec(statement).one()
+
+
+def new_log(db: Session) -> AuditLogCreate:
+    user = create_random_user(db)
+    return AuditLogCreate(
+        created_by=user.id, status=LogResult.success, content=random_lower_string()
+    )
+
+
+def test_synchronous_writer_inserts_immediately(db: Session) -> None:
+    writer = AuditLogWriter(
+        batch_size=100, flush_interval=60, max_buffer=100, synchronous=True
+    )
+    log_create = new_log(db)
+    writer.log(log_create)
+    assert count_logs(db, log_create.content) == 1
+
+
+def test_writer_buffers_until_stopped(db: Session) -> None:
+    writer = AuditLogWriter(batch_size=100, flush_interval=60, max_buffer=100)
+    writer.start()
+    try:
+        log_create = new_log(db)
+        writer.log(log_create)
+        writer.log(log_create)
+        assert writer.stats()["pending"] == 2
+        assert count_logs(db, log_create.content) == 0
+    finally:
+        writer.stop()
+    assert count_logs(db, log_create.content) == 2
+    assert writer.stats()["batches"] == 1
+
+
+def test_writer_flushes_full_batch(db: Session) -> None:
+    writer = AuditLogWriter(batch_size=2, flush_interval=60, max_buffer=100)
+    writer.start()
+    try:
+        log_create = new_log(db)
+        writer.log(log_create)
+        writer.log(log_create)
+        deadline = time.monotonic() + 5
+        while writer.stats()["written"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert count_logs(db, log_create.content) == 2
+    finally:
+        writer.stop()
+
+
+def test_writer_inserts_inline_when_buffer_is_full(db: Session) -> None:
+    writer = AuditLogWriter(batch_size=100, flush_interval=60, max_buffer=1)
+    writer.start()
+    try:
+        log_create = new_log(db)
+        writer.log(log_create)
+        writer.log(log_create)
+        assert count_logs(db, log_create.content) == 1
+    finally:
+        writer.stop()
+    assert count_logs(db, log_create.content) == 2
+
+
+def test_writer_backs_off_while_inserts_fail(db: Session) -> None:
+    writer = AuditLogWriter(batch_size=1, flush_interval=0.1, max_buffer=100)
+    with patch.object(writer, "_insert", side_effect=RuntimeError("db down")) as insert:
+        writer.start()
+        try:
+            writer.log(new_log(db))
+            time.sleep(0.5)
+            # Attempts at about 0, 0.1 and 0.3 seconds, not a busy loop
+            assert 2 <= insert.call_count <= 4
+            assert writer.stats()["pending"] == 1
+        finally:
+            writer.stop()
+    assert writer.stats()["dropped"] == 1
+
+
+def test_create_and_drop_partitions(db: Session) -> None:
+    connection = db.connection()
+    try:
+        create_partitions(connection, start=date(2001, 11, 15), months=3)
+        dropped = drop_expired_partitions(connection, before=date(2002, 1, 31))
+        assert sorted(dropped) == ["audit_log_p200111", "audit_log_p200112"]
+        # The current month is never before the cutoff
+        assert partition_name(date.today()) not in dropped
+    finally:
+        db.rollback()
+
+
+def test_rows_outside_partitions_go_to_default(db: Session) -> None:
+    log_create = new_log(db)
+    connection = db.connection()
+    try:
+        # No partition exists for that month yet, the insert must not fail
+        row = AuditLog.model_validate(log_create).model_dump()
+        row["created_at"] = datetime(2091, 3, 15)
+        connection.execute(insert(AuditLog), [row])
+        create_partitions(connection, start=date(2091, 3, 1), months=1)
+        located = connection.execute(
+            text("SELECT tableoid::regclass::text FROM audit_log WHERE id = :id"),
+            {"id": row["id"]},
+        ).scalar_one()
+        assert located == "audit_log_p209103"
+    finally:
+        db.rollback()
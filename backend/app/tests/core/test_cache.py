@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_get_missing_key() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+
+
+def test_entries_expire() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=5)
+    with patch("app.core.cache.time.monotonic", return_value=130.0):
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+    with patch("app.core.cache.time.monotonic", return_value=161.0):
+        assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_disabled_cache() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_pop() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app.core.hashing import HashingQueueFull, PasswordHasher
+from app.core.security import verify_password
+
+
+def test_hash_and_verify_in_worker_processes() -> None:
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    try:
+        hashed = hasher.hash("secret-password")
+        assert verify_password("secret-password", hashed)
+        assert hasher.verify("secret-password", hashed)
+        assert not hasher.verify("wrong-password", hashed)
+        assert asyncio.run(hasher.verify_async("secret-password", hashed))
+        stats = hasher.stats()
+        assert stats["completed"] == 4
+        assert stats["in_flight"] == 0
+        assert stats["duration_seconds"]["count"] == 4
+    finally:
+        hasher.shutdown()
+
+
+def test_inline_hashing() -> None:
+    hasher = PasswordHasher(max_workers=0, max_queue=1)
+    hashed = hasher.hash("secret-password")
+    assert hasher.verify("secret-password", hashed)
+
+
+def test_rejects_when_queue_is_full() -> None:
+    hasher = PasswordHasher(max_workers=0, max_queue=0)
+    with pytest.raises(HashingQueueFull):
+        hasher.hash("secret-password")
+    assert hasher.stats()["rejected"] == 1
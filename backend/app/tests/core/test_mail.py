@@ -0,0 +1,101 @@
+import time
+from collections.abc import Callable, Generator
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.mail import EmailOutbox
+from app.tests.utils.smtp import SMTPSink
+from app.tests.utils.utils import random_email
+
+
+@pytest.fixture
+def sink() -> Generator[SMTPSink, None, None]:
+    with SMTPSink() as sink, patch.multiple(
+        settings,
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=sink.port,
+        SMTP_TLS=False,
+        SMTP_SSL=False,
+        SMTP_USER=None,
+        SMTP_PASSWORD=None,
+        EMAILS_FROM_EMAIL="noreply@example.com",
+    ):
+        yield sink
+
+
+def new_outbox(**kwargs: float) -> EmailOutbox:
+    options = {
+        "batch_size": 10,
+        "max_attempts": 3,
+        "retry_delay": 0.01,
+        "idle_timeout": 60,
+        "max_queue": 100,
+    }
+    return EmailOutbox(**{**options, **kwargs})  # type: ignore[arg-type]
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_synchronous_outbox_sends_immediately(sink: SMTPSink) -> None:
+    outbox = new_outbox()
+    outbox.send(email_to=random_email(), subject="Hello", html_content="<p>Hi</p>")
+    assert len(sink.messages) == 1
+    assert sink.messages[0]["Subject"] == "Hello"
+
+
+def test_outbox_reuses_connection(sink: SMTPSink) -> None:
+    outbox = new_outbox()
+    outbox.start()
+    try:
+        recipients = [random_email() for _ in range(3)]
+        for email_to in recipients:
+            outbox.send(email_to=email_to, subject="Hello", html_content="<p>Hi</p>")
+        assert outbox.stats()["running"]
+        wait_for(lambda: outbox.stats()["sent"] == 3)
+    finally:
+        outbox.stop()
+    assert sorted(message["To"] for message in sink.messages) == sorted(recipients)
+    assert sink.connections == 1
+
+
+def test_outbox_retries_failed_email(sink: SMTPSink) -> None:
+    sink.fail = 1
+    outbox = new_outbox()
+    outbox.start()
+    try:
+        outbox.send(email_to=random_email(), subject="Hello", html_content="<p>Hi</p>")
+        wait_for(lambda: outbox.stats()["sent"] == 1)
+    finally:
+        outbox.stop()
+    stats = outbox.stats()
+    assert stats["retried"] == 1
+    assert stats["failed"] == 0
+    assert len(sink.messages) == 1
+
+
+def test_outbox_gives_up_after_max_attempts(sink: SMTPSink) -> None:
+    sink.fail = 5
+    outbox = new_outbox(max_attempts=2)
+    outbox.start()
+    try:
+        outbox.send(email_to=random_email(), subject="Hello", html_content="<p>Hi</p>")
+        wait_for(lambda: outbox.stats()["failed"] == 1)
+    finally:
+        outbox.stop()
+    assert outbox.stats()["retried"] == 1
+    assert sink.messages == []
+
+
+def test_stop_sends_queued_emails(sink: SMTPSink) -> None:
+    outbox = new_outbox()
+    outbox.start()
+    outbox.send(email_to=random_email(), subject="Hello", html_content="<p>Hi</p>")
+    outbox.stop()
+    assert len(sink.messages) == 1
+    assert outbox.stats()["pending"] == 0
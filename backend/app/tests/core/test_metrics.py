@@ -0,0 +1,17 @@
+from app.core.metrics import Counter
+
+
+def test_counter_counts_per_label() -> None:
+    counter = Counter()
+    counter.inc("a")
+    counter.inc("a")
+    counter.inc("b", 3)
+    assert counter.snapshot() == {"total": 5, "labels": {"a": 2, "b": 3}}
+
+
+def test_counter_caps_labels() -> None:
+    counter = Counter(max_labels=1)
+    counter.inc("a")
+    counter.inc("b")
+    counter.inc("c")
+    assert counter.snapshot()["labels"] == {"a": 1, "other": 2}
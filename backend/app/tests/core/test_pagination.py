@@ -0,0 +1,31 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor, split_page
+
+
+def test_cursor_round_trip() -> None:
+    values = [datetime(2025, 7, 25, 17, 30, 29, 905957), uuid.uuid4()]
+    cursor = encode_cursor(values)
+    assert decode_cursor(cursor, [datetime, uuid.UUID]) == values
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not-a-cursor", "e30", encode_cursor(["a"]), encode_cursor(["a", "b"])]
+)
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [datetime, uuid.UUID])
+
+
+def test_split_page() -> None:
+    page, next_cursor = split_page([1, 2, 3], 2, lambda row: (row,))
+    assert page == [1, 2]
+    assert next_cursor is not None
+    assert decode_cursor(next_cursor, [int]) == [2]
+
+    page, next_cursor = split_page([1, 2], 2, lambda row: (row,))
+    assert page == [1, 2]
+    assert next_cursor is None
@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.timing import (
+    RequestTimings,
+    TimingMiddleware,
+    instrument_engine,
+    record,
+    route_timings,
+    timed,
+)
+
+engine = create_engine("sqlite://")
+instrument_engine(engine)
+
+app = FastAPI()
+app.add_middleware(TimingMiddleware)
+
+
+@app.get("/things/{thing_id}")
+def read_thing(thing_id: int) -> int:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1")).scalar_one()
+        value: int = connection.execute(
+            text("SELECT :id"), {"id": thing_id}
+        ).scalar_one()
+    with timed("bcrypt"):
+        pass
+    return value
+
+
+client = TestClient(app)
+
+
+def test_server_timing_header() -> None:
+    with patch("app.core.config.settings.SERVER_TIMING_HEADER", True):
+        r = client.get("/things/7")
+    assert r.json() == 7
+    metrics = {
+        entry.split(";")[0]: entry for entry in r.headers["server-timing"].split(", ")
+    }
+    assert set(metrics) == {"total", "db", "bcrypt"}
+    assert metrics["db"].endswith('desc="2 queries"')
+
+
+def test_server_timing_header_disabled() -> None:
+    with patch("app.core.config.settings.SERVER_TIMING_HEADER", False):
+        r = client.get("/things/7")
+    assert "server-timing" not in r.headers
+
+
+def test_route_histograms() -> None:
+    client.get("/things/1")
+    client.get("/no-such-route")
+    routes = route_timings.snapshot()
+    assert routes["GET /things/{thing_id}"]["queries"]["buckets"]["2"] >= 1
+    assert routes["GET /things/{thing_id}"]["total_seconds"]["count"] >= 1
+    assert routes["unmatched"]["queries"]["buckets"]["0"] >= 1
+
+
+def test_record_outside_request_is_ignored() -> None:
+    record("db", 1.0)
+    timings = RequestTimings()
+    timings.add("jwt", 0.0015)
+    assert timings.server_timing(0.01) == "total;dur=10.0, jwt;dur=1.5"
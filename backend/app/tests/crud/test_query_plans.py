@@ -0,0 +1,62 @@
+import json
+import uuid
+from typing import Any
+
+import pytest
+from sqlmodel import Session, col, select
+
+from app.crud import UNIT_PAGE_KEY, unit_name_matches
+from app.models import AuditLog, Item, Unit, UnitUser
+
+
+def explain(db: Session, statement: Any) -> str:
+    """Plan of `statement` as JSON text, with sequential scans discouraged.
+
+    The test tables are tiny, so without `enable_seqscan = off` the planner
+    would rightly prefer a sequential scan and hide a missing index.
+    """
+    connection = db.connection()
+    compiled = statement.compile(connection)
+    try:
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar_one()
+    finally:
+        db.rollback()
+    return json.dumps(plan)
+
+
+some_id = uuid.uuid4()
+
+
+@pytest.mark.parametrize(
+    "statement, index",
+    [
+        (select(Item).where(Item.owner_id == some_id), "ix_item_owner_id"),
+        (select(Unit).where(Unit.created_by == some_id), "ix_unit_created_by"),
+        (select(UnitUser).where(UnitUser.user_id == some_id), "ix_unit_user_user_id"),
+        (
+            select(UnitUser).where(UnitUser.updated_by == some_id),
+            "ix_unit_user_updated_by",
+        ),
+        (
+            select(UnitUser.user_id).where(
+                UnitUser.unit_id == some_id, col(UnitUser.is_leader).is_(True)
+            ),
+            "ix_unit_user_leader",
+        ),
+        # audit_log is partitioned, the plan names the index of each partition
+        (
+            select(AuditLog).where(AuditLog.created_by == some_id),
+            "_created_by_created_at_idx",
+        ),
+        (select(Unit).where(unit_name_matches("phòng")), "ix_unit_name_unaccent_trgm"),
+        (
+            select(Unit).order_by(*UNIT_PAGE_KEY).limit(21),
+            "ix_unit_created_at_id",
+        ),
+    ],
+)
+def test_hot_queries_use_index(db: Session, statement: Any, index: str) -> None:
+    assert index in explain(db, statement)
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.i18n.i18n_config import catalog, load_catalog, validate_catalog
+from app.i18n.utils import missing_keys, resolve_locale, translate
+
+
+def test_catalog_is_flattened_per_locale() -> None:
+    loaded = load_catalog()
+    assert loaded["en"]["unit.created"] == "Unit created successfully"
+    assert loaded["vi"]["unit.created"] == "Tạo đơn vị thành công"
+
+
+def test_catalog_is_read_only() -> None:
+    with pytest.raises(TypeError):
+        catalog["vi"]["unit.created"] = "changed"  # type: ignore[index]
+
+
+def test_validate_catalog_rejects_keys_missing_in_english() -> None:
+    with pytest.raises(ValueError, match="unit.renamed"):
+        validate_catalog(
+            {"en": {"unit.created": "Created"}, "vi": {"unit.renamed": "Đổi tên"}}
+        )
+
+
+def test_translate() -> None:
+    assert translate("unit.created") == "Tạo đơn vị thành công"
+    assert translate("unit.created", "en") == "Unit created successfully"
+
+
+def test_translate_falls_back_to_english() -> None:
+    messages = {"en": {"greeting": "Hello %{name}"}, "vi": {}}
+    with patch("app.i18n.utils.catalog", messages):
+        before = missing_keys.snapshot()["labels"].get("vi:greeting", 0)
+        assert translate("greeting", "vi", name="An") == "Hello An"
+        assert missing_keys.snapshot()["labels"]["vi:greeting"] == before + 1
+        assert translate("missing.key", "vi") == "missing.key"
+
+
+@pytest.mark.parametrize(
+    "accept_language, user_lang, expected",
+    [
+        (None, None, "vi"),
+        ("en-US,en;q=0.9", None, "en"),
+        ("fr-FR, en;q=0.5, vi;q=0.8", None, "vi"),
+        ("en;q=0", None, "vi"),
+        ("fr, de", None, "vi"),
+        ("en", "vi", "vi"),
+    ],
+)
+def test_resolve_locale(
+    accept_language: str | None, user_lang: str | None, expected: str
+) -> None:
+    assert resolve_locale(accept_language, user_lang) == expected
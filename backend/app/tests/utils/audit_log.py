@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.models import AuditLog, LogResult
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_audit_logs(
+    db: Session, count: int, status: LogResult = LogResult.success
+) -> tuple[uuid.UUID, list[AuditLog]]:
+    """Logs of a new user, one second apart, oldest first."""
+    user = create_random_user(db)
+    now = datetime.utcnow()
+    logs = [
+        AuditLog(
+            created_by=user.id,
+            created_at=now - timedelta(seconds=count - i),
+            content=random_lower_string(),
+            status=status,
+        )
+        for i in range(count)
+    ]
+    db.add_all(logs)
+    db.commit()
+    return user.id, logs
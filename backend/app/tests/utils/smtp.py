@@ -0,0 +1,81 @@
+import email
+import socketserver
+import threading
+from email.message import Message
+from types import TracebackType
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "_SMTPServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply("220 sink ESMTP")
+        while line := self.rfile.readline():
+            verb = line.decode().strip()[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                with sink.lock:
+                    failing = sink.fail > 0
+                    sink.fail -= failing
+                if failing:
+                    self.reply("451 Try again later")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                with sink.lock:
+                    sink.messages.append(email.message_from_bytes(b"".join(lines)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    sink: "SMTPSink"
+
+
+class SMTPSink:
+    """
+    SMTP server on localhost that keeps the messages it receives, to test
+    sending emails without a mail server. The next `fail` messages are
+    rejected with a temporary error.
+    """
+
+    def __init__(self) -> None:
+        self.messages: list[Message] = []
+        self.connections = 0
+        self.fail = 0
+        self.lock = threading.Lock()
+        self._server = _SMTPServer(("127.0.0.1", 0), _SMTPHandler)
+        self._server.sink = self
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self) -> "SMTPSink":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._server.shutdown()
+        self._server.server_close()
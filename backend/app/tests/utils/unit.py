@@ -0,0 +1,30 @@
+import uuid
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import UnitCreate, UnitUser
+from app.tests.utils.utils import random_lower_string
+
+
+def unit_members(db: Session, unit_id: uuid.UUID) -> dict[uuid.UUID, bool]:
+    """user_id -> is_leader of the members of a unit."""
+    statement = select(UnitUser).where(UnitUser.unit_id == unit_id)
+    return {member.user_id: member.is_leader for member in db.exec(statement)}
+
+
+def create_random_unit(
+    db: Session, leader_id: uuid.UUID, member_ids: list[uuid.UUID]
+) -> uuid.UUID:
+    unit_in = UnitCreate(
+        name=random_lower_string(), leader_id=leader_id, member_ids=member_ids
+    )
+    unit_id = crud.create_unit(session=db, unit_create=unit_in, creator=leader_id)
+    db.commit()
+    return unit_id
+
+
+def member_row_ids(db: Session, unit_id: uuid.UUID) -> dict[uuid.UUID, uuid.UUID]:
+    """user_id -> id of the unit_user row, to tell kept rows from recreated ones."""
+    statement = select(UnitUser).where(UnitUser.unit_id == unit_id)
+    return {member.user_id: member.id for member in db.exec(statement)}
@@ -5,13 +5,14 @@ from pathlib import Path
 from typing import Any
 import unicodedata
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.core.mail import email_outbox
+from app.core.timing import timed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,12 +24,26 @@ class EmailData:
     subject: str
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).parent / "email-templates" / "build"
+
+# Shared by all emails: templates are compiled once and kept in memory, the
+# bytecode cache (in the temp dir) saves compiling them again in new workers.
+# Locally the files are checked for changes on each render.
+email_templates = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=settings.ENVIRONMENT == "local",
+)
+
+
+def load_email_templates() -> None:
+    """Compile all email templates, called at startup."""
+    for name in email_templates.list_templates(extensions=["html"]):
+        email_templates.get_template(name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
+    return email_templates.get_template(template_name).render(context)
 
 
 def send_email(
@@ -37,23 +52,9 @@ def send_email(
     subject: str = "",
     html_content: str = "",
 ) -> None:
+    """Queue an email, it is sent in the background by the email outbox."""
     assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
+    email_outbox.send(email_to=email_to, subject=subject, html_content=html_content)
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -106,19 +107,21 @@ def generate_password_reset_token(email: str) -> str:
     now = datetime.now(timezone.utc)
     expires = now + delta
     exp = expires.timestamp()
-    encoded_jwt = jwt.encode(
-        {"exp": exp, "nbf": now, "sub": email},
-        settings.SECRET_KEY,
-        algorithm=security.ALGORITHM,
-    )
+    with timed("jwt"):
+        encoded_jwt = jwt.encode(
+            {"exp": exp, "nbf": now, "sub": email},
+            settings.SECRET_KEY,
+            algorithm=security.ALGORITHM,
+        )
     return encoded_jwt
 
 
 def verify_password_reset_token(token: str) -> str | None:
     try:
-        decoded_token = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        with timed("jwt"):
+            decoded_token = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+            )
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
@@ -69,6 +69,24 @@ export const HTTPValidationErrorSchema = {
   title: "HTTPValidationError",
 } as const
 
+export const HealthCheckSchema = {
+  properties: {
+    status: {
+      type: "string",
+      enum: ["ok", "degraded"],
+      title: "Status",
+    },
+    storage: {
+      type: "string",
+      enum: ["ok", "unavailable"],
+      title: "Storage",
+    },
+  },
+  type: "object",
+  required: ["status", "storage"],
+  title: "HealthCheck",
+} as const
+
 export const ItemCreateSchema = {
   properties: {
     title: {
@@ -511,7 +511,9 @@ export class UtilsService {
 
   /**
    * Health Check
-   * @returns boolean Successful Response
+   * Liveness of the API, always 200. `status` is "degraded" while object storage
+   * is unreachable, uploads and avatars fail until it recovers.
+   * @returns HealthCheck Successful Response
    * @throws ApiError
    */
   public static healthCheck(): CancelablePromise<UtilsHealthCheckResponse> {
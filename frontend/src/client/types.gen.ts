@@ -13,6 +13,11 @@ export type HTTPValidationError = {
   detail?: Array<ValidationError>
 }
 
+export type HealthCheck = {
+  status: "ok" | "degraded"
+  storage: "ok" | "unavailable"
+}
+
 export type ItemCreate = {
   title: string
   description?: string | null
@@ -218,4 +223,4 @@ export type UtilsTestEmailData = {
 
 export type UtilsTestEmailResponse = Message
 
-export type UtilsHealthCheckResponse = boolean
+export type UtilsHealthCheckResponse = HealthCheck